@@ -105,7 +105,7 @@ class AddCratersOperator(bpy.types.Operator):
         )
 
         crater_field.place_craters_mesh(
-            crater_field.craters,
+            crater_field.craters_soa,
             mesh=add_craters_item.target_mesh.data,
         )
 
@@ -106,7 +106,7 @@ class AddRocksOperator(bpy.types.Operator):
         )
 
         rock_field.place_rocks(
-            rock_field.rocks,
+            rock_field.rocks_soa,
             asset_directory,
             target_mesh=add_rocks_item.target_mesh,
         )
@@ -206,6 +206,19 @@ def set_camera_type(camera_type: str = "PERSP"):
     bpy.context.scene.camera.data.type = camera_type
 
 
+def set_persistent_data(enabled: bool = True) -> None:
+    """Keeps the Cycles render data, including the BVH, in memory between renders.
+
+    Consecutive renders of the same scene then only sync what changed, e.g. the camera and the sun.
+
+    Parameters
+    ----------
+    enabled (bool): Whether to keep the render data between renders.
+
+    """
+    bpy.context.scene.render.use_persistent_data = enabled
+
+
 def render_blender(
     output_filename: str = "output.png", index: int | None = None, remove_index: bool = True
 ) -> list[str]:
@@ -335,6 +348,38 @@ def setup_moon_scene(device: str = "GPU") -> None:
     bpy.context.scene.render.resolution_y = 1024
 
 
+def enable_gpu_rendering(device_types: tuple[str, ...] = ("OPTIX", "CUDA", "HIP", "ONEAPI", "METAL")) -> str | None:
+    """Enables Cycles GPU rendering with the first compute backend that has devices on this host.
+
+    Parameters
+    ----------
+    device_types (tuple[str, ...]): Cycles compute device types to try, in order of preference.
+
+    Returns
+    -------
+    str | None: The compute device type used, or None if no GPU is available and Cycles stays on the CPU.
+
+    """
+    preferences = bpy.context.preferences.addons["cycles"].preferences
+    for device_type in device_types:
+        try:
+            preferences.compute_device_type = device_type
+        except TypeError:
+            # backend not compiled into this Blender build
+            continue
+        preferences.refresh_devices()
+        if not any(device.type == device_type for device in preferences.devices):
+            continue
+        for device in preferences.devices:
+            device.use = device.type == device_type
+        for scene in bpy.data.scenes:
+            scene.cycles.device = "GPU"
+        print(f"Rendering with Cycles on {device_type}")
+        return device_type
+    preferences.compute_device_type = "NONE"
+    return None
+
+
 def load_mesh(
     mesh_file: str,
     import_mode: str | None = None,
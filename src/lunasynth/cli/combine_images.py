@@ -51,6 +51,12 @@ def main():
 
     parser.add_argument("-s", "--start", type=int, default=0, help="The frame to start from.")
     parser.add_argument("-e", "--end", type=int, default=-1, help="The frame to end at.")
+    parser.add_argument(
+        "--prepack",
+        action="store_true",
+        help="Decode the frames of each camera once into a memory-mapped .npy file in the data directory, "
+        "later runs read it instead of the PNGs while it holds the same frames and no PNG is newer than it.",
+    )
     args = parser.parse_args()
 
     # Check args
@@ -70,6 +76,10 @@ def main():
         print("Start frame must be positive.")
         exit(1)
 
+    if args.prepack:
+        for prefix in args.prefixes:
+            image_tools.prepack_frames(args.data_dir, prefix)
+
     image_tools.export_combine_frames(
         args.data_dir,
         args.prefixes,
@@ -35,6 +35,18 @@ def main():
     parser.add_argument("--fps", type=int, default=30, help="The frames per second of the video.")
     parser.add_argument("-s", "--start", type=int, default=0, help="The frame to start from.")
     parser.add_argument("-e", "--end", type=int, default=-1, help="The frame to end at.")
+    parser.add_argument(
+        "--prepack",
+        action="store_true",
+        help="Decode the frames of each camera once into a memory-mapped .npy file in the data directory, "
+        "later runs read it instead of the PNGs while it holds the same frames and no PNG is newer than it.",
+    )
+    parser.add_argument(
+        "--encoder",
+        type=str,
+        default=None,
+        help="The fourcc code of the video encoder, by default H.264 is used if available, otherwise mp4v.",
+    )
     args = parser.parse_args()
 
     # Check args
@@ -58,6 +70,10 @@ def main():
         print("Start frame must be positive.")
         exit(1)
 
+    if args.prepack:
+        for prefix in args.prefixes:
+            image_tools.prepack_frames(args.data_dir, prefix)
+
     image_tools.create_multiview_video(
         args.data_dir,
         args.prefixes,
@@ -66,6 +82,7 @@ def main():
         args.fps,
         args.start,
         args.end,
+        args.encoder,
     )
 
 
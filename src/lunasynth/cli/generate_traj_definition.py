@@ -19,7 +19,7 @@ import json
 
 import argcomplete
 import pandas as pd
-import yaml
+from lunasynth.config_loader import load_yaml
 
 
 def main():
@@ -35,8 +35,7 @@ def main():
     argcomplete.autocomplete(parser)
     args = parser.parse_args()
 
-    with open(args.scene) as f:
-        scene = yaml.safe_load(f)
+    scene = load_yaml(args.scene)
 
     # read trajectory from csv
     trajectory = pd.read_csv(args.trajectory)
@@ -20,7 +20,7 @@ from pathlib import Path
 
 import argcomplete
 import lunasynth.blender_helper as bh
-import yaml
+from lunasynth.config_loader import load_yaml
 from lunasynth.configuration_manager import CaseManager, RenderingManager
 
 
@@ -38,6 +38,13 @@ def main():
         default=None,
         help="The output directory, overwrites the config file.",
     )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        required=False,
+        default=None,
+        help="The seed to use for the random number generator.",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -61,8 +68,7 @@ def main():
         msg = f"Config file {args.config} not found."
         raise FileNotFoundError(msg)
 
-    with open(args.config) as f:
-        config = yaml.safe_load(f)
+    config = load_yaml(args.config)
 
     if args.cases is not None:
         config["cases"] = int(args.cases)
@@ -85,7 +91,7 @@ def main():
 
     rendering_manager = RenderingManager({})
     cases_dict["cases_list"] = rendering_manager.generate_rendering_cases(
-        config["render_distributions"], n_cases=config["cases"], camera_type="PERSP"
+        config["render_distributions"], n_cases=config["cases"], camera_type="PERSP", seed=args.seed
     )
 
     if args.visualize:
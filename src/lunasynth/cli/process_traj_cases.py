@@ -20,7 +20,7 @@ from pathlib import Path
 
 import argcomplete
 import lunasynth.blender_helper as bh
-import yaml
+from lunasynth.config_loader import load_yaml
 from lunasynth.configuration_manager import CaseManager, RenderingManager
 
 
@@ -41,8 +41,7 @@ def main() -> None:
     argcomplete.autocomplete(parser)
     args = parser.parse_args()
 
-    with open(args.config) as f:
-        config = yaml.safe_load(f)
+    config = load_yaml(args.config)
 
     if "output_dir" not in config:
         # add current time to output dir
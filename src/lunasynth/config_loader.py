@@ -11,11 +11,38 @@
 #  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
+import copy
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 import yaml
 
+# libyaml based loader when PyYAML was built with it, it parses several times faster than the pure Python one
+YAML_SAFE_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@lru_cache(maxsize=64)
+def _parse_yaml_file(file_path: str, mtime_ns: int) -> Any:
+    with open(file_path) as f:
+        return yaml.load(f, YAML_SAFE_LOADER)
+
+
+def load_yaml(file_path: str | Path) -> Any:
+    """Load a yaml (or json) file, reusing the parsed data while the file is unchanged on disk.
+
+    Args:
+    ----
+        file_path (str | Path): Path to the yaml file.
+
+    Returns:
+    -------
+        Any: A copy of the yaml data, which the caller can modify.
+
+    """
+    path = Path(file_path).resolve()
+    return copy.deepcopy(_parse_yaml_file(str(path), path.stat().st_mtime_ns))
+
 
 class ConfigLoader:
     """Wrapper of yaml loading with support for !include directive and updates.
@@ -17,12 +17,14 @@ import copy
 import glob
 import json
 import logging
+import multiprocessing
 import os
-import random
 import time
 from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
 
 import humanize
@@ -36,6 +38,18 @@ def dth(d: float, minimum_unit: str = "microseconds") -> str:
     return humanize.precisedelta(timedelta(seconds=d), minimum_unit=minimum_unit)
 
 
+@lru_cache(maxsize=1024)
+def dth_ms(d_ms: int) -> str:
+    """Converts a time in whole milliseconds to a human readable string, cached for repeated values"""
+    return dth(d_ms / 1e3, minimum_unit="milliseconds")
+
+
+@lru_cache(maxsize=4096)
+def naturaldelta_seconds(seconds: int) -> str:
+    """Converts a whole number of seconds to a natural string, cached since consecutive estimates repeat"""
+    return humanize.naturaldelta(seconds, minimum_unit="seconds")
+
+
 class CaseManager:
     cases_list: list[dict]
 
@@ -77,6 +91,16 @@ class CaseManager:
             acc_grid_base *= grid_sizes[param_value]
         return grid_indices
 
+    def cases_grid_index_arrays(self, grid_sizes: dict[str, int], n_cases: int) -> dict[str, np.ndarray]:
+        """Grid indices of every parameter for all the cases, as returned by cases_grid_indices for each case"""
+        grid_indices = {}
+        i_cases = np.arange(n_cases) % self.get_total_grid_cases(grid_sizes)
+        acc_grid_base = 1
+        for param_value in grid_sizes:
+            grid_indices[param_value] = (i_cases // acc_grid_base) % grid_sizes[param_value]
+            acc_grid_base *= grid_sizes[param_value]
+        return grid_indices
+
     def number_grid_params(self, distributions: dict) -> int:
         return sum(
             [
@@ -86,61 +110,85 @@ class CaseManager:
             ]
         )
 
-    def generate_cases(self, render_distributions: dict, n_cases: int, camera_type: str) -> list[dict]:
-        cases_list = []
+    def generate_cases(
+        self, render_distributions: dict, n_cases: int, camera_type: str, seed: int | None = None
+    ) -> list[dict]:
         n_grid = self.number_grid_params(render_distributions)
+        grid_indices: dict[str, np.ndarray] = {}
         if n_grid > 0:
             grid_sizes, n_cases = self.cases_grid_sizes(render_distributions, n_cases)
-
+            grid_indices = self.cases_grid_index_arrays(grid_sizes, n_cases)
+
+        # Parameters that take the same value in every case are resolved once and copied into each case
+        constants, varying = self.split_constant_params(render_distributions)
+        # Each varying parameter is sampled for all the cases at once and the columns are zipped into cases
+        # The same seed gives the same cases, None draws fresh entropy
+        rng = np.random.default_rng(seed)
+        param_columns = {
+            param_value: self.sample_param_values(param_value, distribution, n_cases, grid_indices, rng)
+            for param_value, distribution in varying
+        }
+        cases_list = []
         for i in range(n_cases):
-            param_values = {}
-            if n_grid > 0:
-                grid_indices = self.cases_grid_indices(grid_sizes, i)
-                print(f"Grid indices: {grid_indices}")
-            for param_value in render_distributions:
-                assert "type" in render_distributions[param_value]
-                if render_distributions[param_value]["type"] == "uniform":
-                    assert "min" in render_distributions[param_value]
-                    assert "max" in render_distributions[param_value]
-                    param_values[param_value] = random.uniform(
-                        render_distributions[param_value]["min"],
-                        render_distributions[param_value]["max"],
-                    )
-                elif render_distributions[param_value]["type"] == "normal":
-                    assert "mean" in render_distributions[param_value]
-                    assert "std" in render_distributions[param_value]
-                    param_values[param_value] = random.normalvariate(
-                        render_distributions[param_value]["mean"],
-                        render_distributions[param_value]["std"],
-                    )
-                elif render_distributions[param_value]["type"] == "list":
-                    assert "values" in render_distributions[param_value]
-                    param_values[param_value] = random.choice(render_distributions[param_value]["values"])
-                elif render_distributions[param_value]["type"] == "fixed":
-                    assert "value" in render_distributions[param_value]
-                    param_values[param_value] = render_distributions[param_value]["value"]
-                elif render_distributions[param_value]["type"] == "grid":
-                    assert "min" in render_distributions[param_value]
-                    assert "max" in render_distributions[param_value]
-                    assert "n_values" in render_distributions[param_value]
-
-                    grid_min = render_distributions[param_value]["min"]
-                    grid_max = render_distributions[param_value]["max"]
-                    n_values = render_distributions[param_value]["n_values"]
-                    grid_index = grid_indices[param_value]
-                    grid_value = grid_min + (grid_max - grid_min) * grid_index / (n_values - 1)
-                    param_values[param_value] = grid_value
-                elif render_distributions[param_value]["type"] == "grid_list":
-                    assert "values" in render_distributions[param_value]
-                    grid_values = render_distributions[param_value]["values"]
-                    grid_index = grid_indices[param_value]
-                    param_values[param_value] = grid_values[grid_index]
-                else:
-                    msg = f"Unknown sampling type: {render_distributions[param_value]['type']}"
-                    raise ValueError(msg)
+            param_values = constants.copy()
+            for param_value, column in param_columns.items():
+                param_values[param_value] = column[i]
             cases_list.append(param_values)
         return cases_list
 
+    def split_constant_params(self, render_distributions: dict) -> tuple[dict, list[tuple[str, dict]]]:
+        """Validates the distributions and splits them into constant values and distributions to sample per case"""
+        constants = {}
+        varying = []
+        for param_value, distribution in render_distributions.items():
+            assert "type" in distribution
+            if distribution["type"] in ("uniform", "grid"):
+                assert "min" in distribution
+                assert "max" in distribution
+                if distribution["type"] == "grid":
+                    assert "n_values" in distribution
+            elif distribution["type"] == "normal":
+                assert "mean" in distribution
+                assert "std" in distribution
+            elif distribution["type"] in ("list", "grid_list"):
+                assert "values" in distribution
+                if distribution["type"] == "list" and len(distribution["values"]) == 1:
+                    constants[param_value] = distribution["values"][0]
+                    continue
+            elif distribution["type"] == "fixed":
+                assert "value" in distribution
+                constants[param_value] = distribution["value"]
+                continue
+            else:
+                msg = f"Unknown sampling type: {distribution['type']}"
+                raise ValueError(msg)
+            varying.append((param_value, distribution))
+        return constants, varying
+
+    def sample_param_values(
+        self,
+        param_value: str,
+        distribution: dict,
+        n_cases: int,
+        grid_indices: dict[str, np.ndarray],
+        rng: np.random.Generator,
+    ) -> list:
+        """Samples the values of a parameter for all the cases"""
+        if distribution["type"] == "uniform":
+            return rng.uniform(distribution["min"], distribution["max"], size=n_cases).tolist()
+        elif distribution["type"] == "normal":
+            return rng.normal(distribution["mean"], distribution["std"], size=n_cases).tolist()
+        elif distribution["type"] == "list":
+            values = distribution["values"]
+            return [values[k] for k in rng.integers(len(values), size=n_cases)]
+        elif distribution["type"] == "grid":
+            grid_min = distribution["min"]
+            grid_max = distribution["max"]
+            n_values = distribution["n_values"]
+            return (grid_min + (grid_max - grid_min) * grid_indices[param_value] / (n_values - 1)).tolist()
+        values = distribution["values"]
+        return [values[k] for k in grid_indices[param_value]]
+
     def save_cases_description(self, cases_dict: dict) -> None:
         os.makedirs(cases_dict["cases_config"]["output_dir"], exist_ok=True)
         print(f"Saving cases description to {cases_dict['cases_config']['output_dir']}")
@@ -218,13 +266,14 @@ class RenderingManager:
         n_cases: int,
         camera_type: str,
         surface_z_interpolant: Callable | None = None,
+        seed: int | None = None,
     ) -> list[dict]:
         self.rendering_cases_manager = CaseManager()
         start = time.time()
         render_distributions = self.adjust_render_distributions(render_distributions, camera_type)
         print(f"Time to adjust render distributions: {dth(time.time() - start)}")
         start = time.time()
-        cases_list = self.rendering_cases_manager.generate_cases(render_distributions, n_cases, camera_type)
+        cases_list = self.rendering_cases_manager.generate_cases(render_distributions, n_cases, camera_type, seed=seed)
         print(f"Time to generate cases: {dth(time.time() - start)}")
         start = time.time()
         cases_list = self.adjust_rendering_cases(cases_list, camera_type, surface_z_interpolant)
@@ -303,6 +352,9 @@ class RenderingManager:
         output_case_dir: str,
     ) -> None:
         print(f"Rendering {len(cases_dict['cases_list'])} cases")
+        # only the camera and the sun change between cases, so the scene is synced to Cycles once
+        bh.set_persistent_data(True)
+        output_case_path = Path(output_case_dir)
         for i, case in enumerate(cases_dict["cases_list"]):
             self.render_case_index = i
             if "camera/ortho_scale" in case:
@@ -316,11 +368,12 @@ class RenderingManager:
                 case["camera/yaw"],
             )
             bh.set_sun_orientation(case["sun/elevation"], case["sun/azimuth"])
-            rgb_filename = Path(output_case_dir) / Path(f"rgb_{i:03d}.png")
-            start_time = time.time()
+            rgb_filename = output_case_path / f"rgb_{i:03d}.png"
+            start_time_ns = time.perf_counter_ns()
             render_filenames_list = bh.render_blender(output_filename=rgb_filename, index=i)
-            self.time_rendering.append(time.time() - start_time)
-            print(f"Time to render: {dth(time.time() - start_time)}")
+            elapsed_ns = time.perf_counter_ns() - start_time_ns
+            self.time_rendering.append(elapsed_ns / 1e9)
+            print(f"Time to render: {dth_ms(elapsed_ns // 1_000_000)}")
             self.print_progress()
             case["files"] = render_filenames_list
             case["case_id"] = i
@@ -366,6 +419,8 @@ class RenderingManager:
             json.dump(config, f, cls=PathEncoder)
 
     def print_progress(self) -> None:
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         if len(self.time_rendering) > 0:
             # Evaluate time left based on measured time: on the first render,
             # we use the average time per rendering to get an early estimate.
@@ -402,16 +457,20 @@ class RenderingManager:
             # print(f"Time left: {time_left}")
             expected_end = datetime.now() + timedelta(seconds=time_left)
 
-            time_str = (
-                f"Time left: {humanize.naturaldelta(time_left, minimum_unit='seconds')}, "
-                f"Expected end: {expected_end:%Y-%m-%d %H:%M}"
-            )
+            time_str = f"Time left: {naturaldelta_seconds(int(time_left))}, Expected end: {expected_end:%Y-%m-%d %H:%M}"
         else:
             time_str = ""
         self.logger.info(
-            f"Progress {self.render_index}/{self.planned_cases}: {self.base_mesh_index+1}/{self.n_meshes} meshes,"
-            f" {self.terrain_index+1}/{self.n_terrain} terrains, "
-            f"{self.render_case_index+1}/{self.n_rendering_cases} rendering cases, {time_str}"
+            "Progress %d/%d: %d/%d meshes, %d/%d terrains, %d/%d rendering cases, %s",
+            self.render_index,
+            self.planned_cases,
+            self.base_mesh_index + 1,
+            self.n_meshes,
+            self.terrain_index + 1,
+            self.n_terrain,
+            self.render_case_index + 1,
+            self.n_rendering_cases,
+            time_str,
         )
 
     def run_dataset_generation(self) -> None:
@@ -423,11 +482,13 @@ class RenderingManager:
         self.dataset_config_name = self.dataset_config["name"]
         executed_cases = 0
         meshes = self.dataset_config["base_mesh"]["meshes"]
-        self.n_meshes = len(meshes)
-        self.n_terrain = self.dataset_config["terrain"]["samples"]
-        self.n_rendering_cases = self.dataset_config["rendering_cases"]["cases"]
-        planned_cases = self.n_meshes * self.n_terrain * self.n_rendering_cases
-        self.planned_cases = planned_cases
+        terrain_config = self.dataset_config["terrain"]
+        render_config = self.dataset_config["rendering"]
+        cases_config = self.dataset_config["rendering_cases"]
+        output_config = self.dataset_config["output"]
+        n_terrain = terrain_config["samples"]
+        self.set_campaign_size(len(meshes), n_terrain, cases_config["cases"])
+        planned_cases = self.planned_cases
         print(
             f"Planned cases {planned_cases}: {self.n_meshes} meshes x {self.n_terrain} "
             f"terrains x {self.n_rendering_cases} rendering cases"
@@ -435,43 +496,95 @@ class RenderingManager:
         if self.dataset_config.get("dry_run", False):
             print("Dry run, skipping")
             return
-        base_path = Path(self.dataset_config["output"]["output_dir"])
+        dry_run_terrain_generation = self.dataset_config.get("dry_run_terrain_generation", False)
+        dry_run_rendering = self.dataset_config.get("dry_run_rendering", False)
+        add_rendering_cases_blender = output_config.get("add_rendering_cases_blender", False)
+        save_blender_file = output_config.get("save_blender_file", False)
+        base_path = Path(output_config["output_dir"])
         self.logger.info(
             f"Starting rendering campaign for {self.dataset_config_name} config"
-            f"in {self.dataset_config['output']['output_dir']} of {planned_cases} cases"
+            f"in {output_config['output_dir']} of {planned_cases} cases"
         )
         start_time_dataset = time.time()
-        for mesh_base_index, mesh_file in enumerate(meshes):
-            start_time_mesh = time.time()
-            print(f"Generating terrain instances for {mesh_file}")
-            self.base_mesh_index = mesh_base_index
-            for terrain_index in range(self.dataset_config["terrain"]["samples"]):
-                start_time_terrain = time.time()
-                self.terrain_index = terrain_index
-                if self.dataset_config.get("dry_run_terrain_generation", False):
+        parallel_workers = self.dataset_config.get("parallel_workers", 1)
+        if parallel_workers > 1 and not dry_run_terrain_generation:
+            executed_cases = self.run_dataset_generation_parallel(meshes, base_path, parallel_workers)
+        else:
+            for mesh_base_index, mesh_file in enumerate(meshes):
+                start_time_mesh = time.time()
+                print(f"Generating terrain instances for {mesh_file}")
+                self.base_mesh_index = mesh_base_index
+                if dry_run_terrain_generation:
+                    self.time_mesh.append(time.time() - start_time_mesh)
                     continue
-                print(f"Generating terrain {terrain_index}")
-                output_case_dir = (
-                    base_path / Path(f"mesh_{Path(mesh_file).stem}") / Path(f"terrain_{terrain_index:02d}")
-                )
-
-                cases_dict = self.run_terrain_rendering(
-                    terrain_dict=self.dataset_config["terrain"],
-                    mesh_file=mesh_file,
-                    cases_config=self.dataset_config["rendering_cases"],
-                    render_config=self.dataset_config["rendering"],
-                    output_case_dir=str(output_case_dir),
-                    dry_run_rendering=self.dataset_config.get("dry_run_rendering", False),
-                )
-                executed_cases += len(cases_dict["cases_list"])
-                self.time_terrain.append(time.time() - start_time_terrain)
-            self.time_mesh.append(time.time() - start_time_mesh)
+                mesh_path = base_path / f"mesh_{Path(mesh_file).stem}"
+                for terrain_index in range(n_terrain):
+                    start_time_terrain = time.time()
+                    self.terrain_index = terrain_index
+                    print(f"Generating terrain {terrain_index}")
+                    output_case_dir = mesh_path / f"terrain_{terrain_index:02d}"
+
+                    cases_dict = self.run_terrain_rendering(
+                        terrain_dict=terrain_config,
+                        mesh_file=mesh_file,
+                        cases_config=cases_config,
+                        render_config=render_config,
+                        output_case_dir=str(output_case_dir),
+                        dry_run_rendering=dry_run_rendering,
+                        add_rendering_cases_blender=add_rendering_cases_blender,
+                        save_blender_file=save_blender_file,
+                    )
+                    executed_cases += len(cases_dict["cases_list"])
+                    self.time_terrain.append(time.time() - start_time_terrain)
+                self.time_mesh.append(time.time() - start_time_mesh)
         print(f"Executed cases: {executed_cases}/{planned_cases}")
         self.logger.info(
             f"Rendering done, {executed_cases} cases executed in "
             f"{humanize.naturaldelta(time.time() - start_time_dataset)}"
         )
 
+    def set_campaign_size(self, n_meshes: int, n_terrain: int, n_rendering_cases: int) -> None:
+        self.n_meshes = n_meshes
+        self.n_terrain = n_terrain
+        self.n_rendering_cases = n_rendering_cases
+        self.planned_cases = n_meshes * n_terrain * n_rendering_cases
+
+    def run_dataset_generation_parallel(self, meshes: list[str], base_path: Path, parallel_workers: int) -> int:
+        """Render every (mesh, terrain) pair in its own worker process.
+
+        Each pair writes to an independent output directory, so the pairs are dispatched to a
+        process pool. Workers are spawned rather than forked so that each one gets a clean Blender
+        instance. Returns the number of executed rendering cases.
+        """
+        print(f"Running dataset generation with {parallel_workers} parallel workers")
+        executed_cases = 0
+        time_mesh = [0.0] * len(meshes)
+        with ProcessPoolExecutor(
+            max_workers=parallel_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = {}
+            for mesh_base_index, mesh_file in enumerate(meshes):
+                mesh_path = base_path / f"mesh_{Path(mesh_file).stem}"
+                for terrain_index in range(self.n_terrain):
+                    future = executor.submit(
+                        _run_terrain_rendering_job,
+                        self.dataset_config,
+                        (self.n_meshes, self.n_terrain, self.n_rendering_cases),
+                        mesh_base_index,
+                        mesh_file,
+                        terrain_index,
+                        str(mesh_path / f"terrain_{terrain_index:02d}"),
+                    )
+                    futures[future] = mesh_base_index
+            for future in as_completed(futures):
+                n_cases, time_terrain = future.result()
+                executed_cases += n_cases
+                self.time_terrain.append(time_terrain)
+                time_mesh[futures[future]] += time_terrain
+                self.render_index += n_cases
+        self.time_mesh.extend(time_mesh)
+        return executed_cases
+
     def run_terrain_rendering(
         self,
         terrain_dict: dict,
@@ -480,6 +593,8 @@ class RenderingManager:
         render_config: dict,
         output_case_dir: str,
         dry_run_rendering: bool = False,
+        add_rendering_cases_blender: bool = False,
+        save_blender_file: bool = False,
     ) -> dict:
         print("Setting up scene")
         bh.setup_moon_scene(device=render_config.get("device", "GPU"))
@@ -514,14 +629,45 @@ class RenderingManager:
             cases_dict["cases_config"]["output_dir"] = str(output_case_dir)
         CaseManager().save_cases_description(cases_dict)
 
-        if self.dataset_config["output"].get("add_rendering_cases_blender", False):
+        if add_rendering_cases_blender:
             start = time.time()
             bh.add_cases_visalization(cases_dict["cases_list"], connect_cases=False)
             print(f"Time to add cases visualization: {dth(time.time() - start)}")
 
-        if self.dataset_config["output"].get("save_blender_file", False):
+        if save_blender_file:
             start = time.time()
             output_blend_file = str(Path(output_case_dir) / Path("terrain.blend"))
             bh.save_blender_file(output_blend_file)
             print(f"Time to save blend file: {dth(time.time() - start)}")
         return cases_dict
+
+
+def _run_terrain_rendering_job(
+    dataset_config: dict,
+    campaign_size: tuple[int, int, int],
+    mesh_base_index: int,
+    mesh_file: str,
+    terrain_index: int,
+    output_case_dir: str,
+) -> tuple[int, float]:
+    """Worker entry point for RenderingManager.run_dataset_generation_parallel.
+
+    Returns the number of rendered cases and the time spent on the terrain.
+    """
+    start_time_terrain = time.time()
+    rendering_manager = RenderingManager(dataset_config)
+    rendering_manager.set_campaign_size(*campaign_size)
+    rendering_manager.base_mesh_index = mesh_base_index
+    rendering_manager.terrain_index = terrain_index
+    print(f"Generating terrain {terrain_index} for {mesh_file}")
+    cases_dict = rendering_manager.run_terrain_rendering(
+        terrain_dict=dataset_config["terrain"],
+        mesh_file=mesh_file,
+        cases_config=dataset_config["rendering_cases"],
+        render_config=dataset_config["rendering"],
+        output_case_dir=output_case_dir,
+        dry_run_rendering=dataset_config.get("dry_run_rendering", False),
+        add_rendering_cases_blender=dataset_config["output"].get("add_rendering_cases_blender", False),
+        save_blender_file=dataset_config["output"].get("save_blender_file", False),
+    )
+    return len(cases_dict["cases_list"]), time.time() - start_time_terrain
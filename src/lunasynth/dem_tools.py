@@ -12,12 +12,22 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 import math
+import os
+import shutil
+from functools import lru_cache
 
 import numpy as np
 import rasterio as rio
+import rasterio.coords
+import rasterio.crs
+import rasterio.enums
+import rasterio.windows
+from numba import njit, prange
 from rasterio.warp import transform
 from scipy.ndimage import zoom
 
+MOON_AXIS_TILT = 1.54 * np.pi / 180
+
 
 class DEM:
     """A class to represent a Digital Elevation Model (DEM)."""
@@ -32,7 +42,8 @@ class DEM:
         """
         self.file_path = file_path
         self.dataset = rio.open(file_path)
-        self.band1 = self.dataset.read(1)
+        self._band1 = None
+        # Dataset properties are copied once, each access to the rasterio dataset goes through GDAL
         self.res = self.dataset.res
         self.meta = self.dataset.meta
         self.crs = self.dataset.crs
@@ -41,6 +52,39 @@ class DEM:
         self.profile = self.dataset.profile
         self.width = self.dataset.width
         self.height = self.dataset.height
+        # The elevation band is always handled as float32: ~7 significant digits are enough for lunar
+        # elevations in meters and it halves the memory traffic of zoom and of the mesh generation
+        self.meta["dtype"] = "float32"
+        self.profile["dtype"] = "float32"
+        if self.dataset.nodata is not None:
+            self.meta["nodata"] = np.nan
+            self.profile["nodata"] = np.nan
+
+    @property
+    def band1(self) -> np.ndarray:
+        """Elevation band, read from the dataset on first access so metadata-only use never loads the raster."""
+        if self._band1 is None:
+            self._band1 = self.read_band()
+        return self._band1
+
+    @band1.setter
+    def band1(self, value: np.ndarray):
+        self._band1 = value
+
+    def read_band(
+        self,
+        window: rio.windows.Window | None = None,
+        out_shape: tuple[int, int] | None = None,
+        resampling: rio.enums.Resampling = rio.enums.Resampling.bilinear,
+    ) -> np.ndarray:
+        """Read the elevation band (or a window of it) as float32, with nodata pixels set to NaN.
+
+        If out_shape is given, the band is resampled to that shape by GDAL while reading.
+        """
+        band = self.dataset.read(1, window=window, out_dtype="float32", out_shape=out_shape, resampling=resampling)
+        if self.dataset.nodata is not None and not np.isnan(self.dataset.nodata):
+            band[band == np.float32(self.dataset.nodata)] = np.nan
+        return band
 
     def __str__(self):
         return f"DEM: {self.file_path}"
@@ -61,18 +105,29 @@ class DEM:
         rio.plot.show(self.band1, title=self.file_path)
 
     def save(self, file_path):
-        with rio.open(file_path, "w", **self.meta) as dst:
+        if self._band1 is None and self.dataset.dtypes[0] == "float32" and self.dataset.nodata is None:
+            # The band was never loaded, so it cannot have been modified: the file on disk is already the result
+            shutil.copyfile(self.file_path, file_path)
+            return
+        meta = dict(self.meta)
+        if "compress" in self.profile:
+            meta["compress"] = self.profile["compress"]
+        with rio.open(file_path, "w", **meta) as dst:
+            # A single write lets GDAL split the band into blocks, a Python loop over striped blocks is slower
             dst.write(self.band1, 1)
 
     def crop(self, x1: float, y1: float, x2: float, y2: float):
-        """Crop the DEM to a given bounding box.
+        """Crop the DEM to a given bounding box in the DEM coordinate reference system.
+
+        Only the pixels inside the bounding box are read from the dataset if the band
+        has not been loaded yet.
 
         Args:
         ----
             x1 (float): Left coordinate of the bounding box
-            y1 (float): Top coordinate of the bounding box
+            y1 (float): Bottom coordinate of the bounding box
             x2 (float): Right coordinate of the bounding box
-            y2 (float): Bottom coordinate of the bounding box
+            y2 (float): Top coordinate of the bounding box
 
         Raises:
         ------
@@ -83,11 +138,16 @@ class DEM:
         assert y1 < y2, "y1 must be less than y2"
         assert x1 >= self.bounds.left, "x1 must be greater than or equal to the left bound"
         assert x2 <= self.bounds.right, "x2 must be less than or equal to the right bound"
-        assert y1 >= self.bounds.top, "y1 must be greater than or equal to the top bound"
-        assert y2 <= self.bounds.bottom, "y2 must be less than or equal to the bottom bound"
-
-        cropped_array = self.band1[int(y1) : int(y2), int(x1) : int(x2)]
-        new_transform = self.transform * self.transform.translation(x1, y1)
+        assert y1 >= self.bounds.bottom, "y1 must be greater than or equal to the bottom bound"
+        assert y2 <= self.bounds.top, "y2 must be less than or equal to the top bound"
+
+        window = rio.windows.from_bounds(x1, y1, x2, y2, transform=self.transform).round_offsets().round_lengths()
+        if self._band1 is None:
+            cropped_array = self.read_band(window=window)
+        else:
+            cropped_array = self._band1[window.toslices()]
+        new_transform = rio.windows.transform(window, self.transform)
+        new_bounds = rio.coords.BoundingBox(*rio.windows.bounds(window, self.transform))
         new_meta = {
             "driver": "GTiff",
             "height": cropped_array.shape[0],
@@ -99,21 +159,49 @@ class DEM:
         }
         self.band1 = cropped_array
         self.meta = new_meta
+        self.profile.update(
+            {
+                "height": cropped_array.shape[0],
+                "width": cropped_array.shape[1],
+                "transform": new_transform,
+            }
+        )
+        self.transform = new_transform
+        self.height, self.width = cropped_array.shape
+        self.bounds = new_bounds
 
-    def zoom(self, factor: float = 2.0):
-        """Increase the resolution of the DEM by a given factor using bilinear interpolation.
+    def zoom(self, factor: float = 2.0, method: str = "cubic"):
+        """Change the resolution of the DEM by a given factor.
+
+        The default cubic spline interpolation is scipy's zoom. The bilinear method is a parallel Numba
+        kernel, much faster on large DEMs but smoother than the cubic spline. A factor < 1 on a DEM whose
+        band has not been loaded yet is resampled by GDAL while reading, with the same interpolation, so the
+        full-resolution raster is never held in memory.
 
         Args:
         ----
-            factor (float): Zoom factor > 1 (default is 2.0)
+            factor (float): Zoom factor > 0 (default is 2.0)
+            method (str): "cubic" (default) or "bilinear"
 
         Raises:
         ------
-            ValueError: If the zoom factor is less than or equal to 1
+            ValueError: If the zoom method is unknown
 
         """
-        assert factor > 1, "Zoom factor must be greater than 1"
-        zoomed_array = zoom(self.band1, factor)
+        assert factor > 0, "Zoom factor must be greater than 0"
+        resampling_methods = {"bilinear": rio.enums.Resampling.bilinear, "cubic": rio.enums.Resampling.cubic}
+        if method in resampling_methods and factor < 1 and self._band1 is None:
+            out_shape = (max(round(self.height * factor), 1), max(round(self.width * factor), 1))
+            zoomed_array = self.read_band(out_shape=out_shape, resampling=resampling_methods[method])
+        elif method == "bilinear":
+            out_height = round(self.band1.shape[0] * factor)
+            out_width = round(self.band1.shape[1] * factor)
+            zoomed_array = zoom_bilinear_numba(self.band1, out_height, out_width)
+        elif method == "cubic":
+            zoomed_array = zoom(self.band1, factor)
+        else:
+            msg = f"Unknown zoom method: {method}"
+            raise ValueError(msg)
         new_transform = self.transform * self.transform.scale(
             (self.width / zoomed_array.shape[-1]),
             (self.height / zoomed_array.shape[-2]),
@@ -136,6 +224,8 @@ class DEM:
             }
         )
         self.res = (self.res[0] / factor, self.res[1] / factor)
+        self.transform = new_transform
+        self.height, self.width = zoomed_array.shape
 
     def analyze(self):
         print("Metadata:")
@@ -153,40 +243,122 @@ class DEM:
 
         """
         # from http://downloads.esri.com/support/documentation/ims_/ArcXML9/Support_files/elements/gcs.htm
-        lunar_south_crs = "ESRI:103878"  # Moon 2000 South Pole Stereographic
-        lunar_center_crs = "ESRI:104903"  # GCS_Moon_2000
-        center_y = (self.dataset.bounds.left + self.dataset.bounds.right) / 2
-        center_x = (self.dataset.bounds.top + self.dataset.bounds.bottom) / 2
-        long, lat = transform(lunar_south_crs, lunar_center_crs, [center_y], [center_x])
+        lunar_south_crs = get_crs("ESRI:103878")  # Moon 2000 South Pole Stereographic
+        lunar_center_crs = get_crs("ESRI:104903")  # GCS_Moon_2000
+        left, bottom, right, top = self.bounds
+        center_x = (left + right) / 2
+        center_y = (top + bottom) / 2
+        long, lat = transform(lunar_south_crs, lunar_center_crs, [center_x], [center_y])
         return math.radians(lat[0]), math.radians(long[0])
 
 
+def load_dem(file_path: str, use_cache: bool = True) -> np.ndarray:
+    """Read the elevation band of a DEM as float32, caching the decoded band in a .npy file next to the DEM.
+
+    The cache is used while it is newer than the DEM. It is memory mapped copy-on-write, so only the touched
+    pages are read from disk and changes to the returned array never reach the cache file. If the cache cannot
+    be written, e.g. in a read-only directory, the band is returned uncached.
+    """
+    cache_path = f"{file_path}.npy"
+    if use_cache and os.path.exists(cache_path) and os.path.getmtime(cache_path) > os.path.getmtime(file_path):
+        return np.load(cache_path, mmap_mode="c")
+    with DEM(file_path) as dem:
+        band = dem.read_band()
+    if use_cache:
+        # written to a temporary file of this process and moved into place, so an interrupted or concurrent
+        # run never leaves a truncated cache newer than the DEM
+        tmp_cache_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_cache_path, "wb") as f:
+                np.save(f, band)
+            os.replace(tmp_cache_path, cache_path)
+        except OSError as e:
+            print(f"Could not cache {file_path} to {cache_path}: {e}")
+            if os.path.exists(tmp_cache_path):
+                os.remove(tmp_cache_path)
+    return band
+
+
+@lru_cache(maxsize=None)
+def get_crs(crs_name: str) -> rio.crs.CRS:
+    """Parse a CRS definition once and reuse it for every coordinate transformation"""
+    return rio.crs.CRS.from_user_input(crs_name)
+
+
+@njit(parallel=True, cache=True)
+def zoom_bilinear_numba(band: np.ndarray, out_height: int, out_width: int, strip_rows: int = 64) -> np.ndarray:
+    # Same sampling grid as scipy.ndimage.zoom(band, factor, order=1): the corner pixels are aligned
+    height, width = band.shape
+    scale_y = (height - 1) / (out_height - 1) if out_height > 1 else 0.0
+    scale_x = (width - 1) / (out_width - 1) if out_width > 1 else 0.0
+
+    # The column indices and weights are the same for every row, compute them once
+    x0 = np.empty(out_width, dtype=np.int64)
+    x1 = np.empty(out_width, dtype=np.int64)
+    wx = np.empty(out_width)
+    for j in range(out_width):
+        x = j * scale_x
+        x0[j] = min(int(x), width - 1)
+        x1[j] = min(x0[j] + 1, width - 1)
+        wx[j] = x - x0[j]
+
+    # Output rows are produced in strips so each thread works on a few consecutive input rows
+    # that stay in cache, writing straight into the preallocated output
+    zoomed = np.empty((out_height, out_width), dtype=band.dtype)
+    n_strips = (out_height + strip_rows - 1) // strip_rows
+    for strip in prange(n_strips):
+        for i in range(strip * strip_rows, min((strip + 1) * strip_rows, out_height)):
+            y = i * scale_y
+            y0 = min(int(y), height - 1)
+            y1 = min(y0 + 1, height - 1)
+            wy = y - y0
+            for j in range(out_width):
+                top = band[y0, x0[j]] * (1.0 - wx[j]) + band[y0, x1[j]] * wx[j]
+                bottom = band[y1, x0[j]] * (1.0 - wx[j]) + band[y1, x1[j]] * wx[j]
+                zoomed[i, j] = top * (1.0 - wy) + bottom * wy
+    return zoomed
+
+
+def rad_to_dms_vec(rad: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Convert an array of angles in radians to degrees, minutes and seconds arrays."""
+    deg = np.degrees(np.asarray(rad, dtype=float))
+    # Split the degrees into the integer part and the fractional part converted to minutes
+    min_float, d = np.modf(deg)
+    min_float *= 60
+    # Split the minutes into the integer part and the fractional part converted to seconds
+    s, m = np.modf(min_float)
+    s *= 60
+    return d.astype(np.int64), m.astype(np.int64), s
+
+
 def rad_to_dms(rad):
-    # Convert radians to degrees
-    deg = math.degrees(rad)
-    # Get the integer part of the degrees
-    d = int(deg)
+    d, m, s = rad_to_dms_vec(rad)
+    return int(d), int(m), float(s)
 
-    # Get the fractional part and convert to minutes
-    min_float = (deg - d) * 60
-    m = int(min_float)
 
-    # Get the fractional part of minutes and convert to seconds
-    s = (min_float - m) * 60
-    return d, m, s
+def latlong_rad_to_strings_vec(lat: np.ndarray, long: np.ndarray) -> tuple[list[str], list[str]]:
+    lat = np.asarray(lat, dtype=float)
+    lat_d, lat_m, lat_s = rad_to_dms_vec(np.abs(lat))
+    long_d, long_m, long_s = rad_to_dms_vec(long)
+    n_s = np.where(lat > 0, "N", "S")
+    # e_w = "E" if long > math.pi else "W"
+    lat_strings = [
+        f"{d}°{m}'{s:.0f}\"{h}" for d, m, s, h in zip(lat_d.ravel(), lat_m.ravel(), lat_s.ravel(), n_s.ravel())
+    ]
+    long_strings = [f"{d}°{m}'{s:.0f}\"" for d, m, s in zip(long_d.ravel(), long_m.ravel(), long_s.ravel())]
+    return lat_strings, long_strings
 
 
 def latlong_rad_to_strings(lat, long):
-    d, m, s = rad_to_dms(abs(lat))
-    n_s = "N" if lat > 0 else "S"
-    lat_string = f"{d}°{m}'{s:.0f}\"{n_s}"
-    d, m, s = rad_to_dms(long)
-    # e_w = "E" if long > math.pi else "W"
-    long_string = f"{d}°{m}'{s:.0f}\""
-    return lat_string, long_string
+    lat_strings, long_strings = latlong_rad_to_strings_vec(lat, long)
+    return lat_strings[0], long_strings[0]
 
 
-def compute_sun_elevation_azimuth(latitude: float, sun_hour_normalized: float = 0.0, sun_season: float = 0.0):
+def compute_sun_elevation_azimuth(
+    latitude: float | np.ndarray,
+    sun_hour_normalized: float | np.ndarray = 0.0,
+    sun_season: float | np.ndarray = 0.0,
+):
     """Compute the elevation and azimuth of the sun for a given latitude, sun hour, and sun season.
 
     Sun hour represents the time of the day normalized to the range (-1, 1),
@@ -194,30 +366,45 @@ def compute_sun_elevation_azimuth(latitude: float, sun_hour_normalized: float =
     the time of the year normalized to the range (-1, 1), where -1 is winter, 0 is spring,
     and 1 is summer. Lunar declination is assumed to be 1.54 degrees.
 
+    The inputs can be scalars or arrays, which are broadcast against each other to
+    compute a batch of sun positions at once.
+
     Args:
     ----
-        latitude (float): Latitude in radians
-        sun_hour_normalized (float): Sun hour normalized to the range (-1, 1)
+        latitude (float | np.ndarray): Latitude in radians
+        sun_hour_normalized (float | np.ndarray): Sun hour normalized to the range (-1, 1)
         sun_season: Sun season normalized to the range (-1, 1)
 
     Returns:
     -------
-        Tuple[float, float]: Elevation and azimuth of the sun in radians
+        Tuple[float | np.ndarray, float | np.ndarray]: Elevation and azimuth of the sun in radians
 
     """
-    moon_axis_tilt = 1.54 * np.pi / 180
-    moon_declination = moon_axis_tilt * sun_season
-
-    if abs(latitude) < np.pi / 2 - abs(moon_declination):
-        # Normal case, sun rises and sets. Only case for latitude < 88.46 degrees
-        zero_elevation_sun_angle = np.arccos(
-            -np.sin(latitude) * np.sin(moon_declination) / np.cos(latitude) / np.cos(moon_declination)
+    if np.ndim(latitude) == 0 and np.ndim(sun_hour_normalized) == 0 and np.ndim(sun_season) == 0:
+        elevation, azimuth, below_horizon = _sun_elevation_azimuth_scalar(
+            float(latitude), float(sun_hour_normalized), float(sun_season)
         )
-    else:
-        # Sun does not rise or set
-        if abs(latitude + moon_declination) < np.pi / 2:
+        if below_horizon:
+            moon_declination = MOON_AXIS_TILT * sun_season
             print(f"Warning: Sun is below the horizon for latitude {latitude} and moon declination {moon_declination}")
-        zero_elevation_sun_angle = np.pi
+        return elevation, azimuth
+
+    latitude = np.asarray(latitude, dtype=float)
+    sun_hour_normalized = np.asarray(sun_hour_normalized, dtype=float)
+    moon_axis_tilt = MOON_AXIS_TILT
+    moon_declination = moon_axis_tilt * np.asarray(sun_season, dtype=float)
+
+    # Normal case, sun rises and sets. Only case for latitude < 88.46 degrees.
+    # Otherwise the sun does not rise or set.
+    sun_rises = np.abs(latitude) < np.pi / 2 - np.abs(moon_declination)
+    if not np.all(sun_rises | (np.abs(latitude + moon_declination) >= np.pi / 2)):
+        print(f"Warning: Sun is below the horizon for latitude {latitude} and moon declination {moon_declination}")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        zero_elevation_sun_angle = np.where(
+            sun_rises,
+            np.arccos(-np.sin(latitude) * np.sin(moon_declination) / np.cos(latitude) / np.cos(moon_declination)),
+            np.pi,
+        )
 
     sun_angle = zero_elevation_sun_angle * sun_hour_normalized
 
@@ -227,3 +414,27 @@ def compute_sun_elevation_azimuth(latitude: float, sun_hour_normalized: float =
     elevation = np.arcsin(Sz)
     azimuth = np.arctan2(-Sx, -Sy)
     return elevation, azimuth
+
+
+@njit(cache=True, fastmath=True)
+def _sun_elevation_azimuth_scalar(
+    latitude: float, sun_hour_normalized: float, sun_season: float
+) -> tuple[float, float, bool]:
+    # Scalar version of compute_sun_elevation_azimuth, avoids the NumPy dispatch overhead on single cases
+    moon_declination = MOON_AXIS_TILT * sun_season
+    below_horizon = False
+    if abs(latitude) < math.pi / 2 - abs(moon_declination):
+        zero_elevation_sun_angle = math.acos(
+            -math.sin(latitude) * math.sin(moon_declination) / math.cos(latitude) / math.cos(moon_declination)
+        )
+    else:
+        below_horizon = abs(latitude + moon_declination) < math.pi / 2
+        zero_elevation_sun_angle = math.pi
+
+    sun_angle = zero_elevation_sun_angle * sun_hour_normalized
+
+    Sx = math.cos(moon_declination) * math.sin(sun_angle)
+    cos_declination_sun_angle = math.cos(moon_declination) * math.cos(sun_angle)
+    Sy = math.cos(latitude) * math.sin(moon_declination) - math.sin(latitude) * cos_declination_sun_angle
+    Sz = math.sin(latitude) * math.sin(moon_declination) + math.cos(latitude) * cos_declination_sun_angle
+    return math.asin(Sz), math.atan2(-Sx, -Sy), below_horizon
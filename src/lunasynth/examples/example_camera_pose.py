@@ -14,25 +14,50 @@
 #  limitations under the License.
 
 import argparse
-import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 import lunasynth.blender_helper as bh
+import numpy as np
+
+
+def render_pose(pose: tuple[float, float, float, float, float, str]) -> None:
+    x, y, z, pitch, yaw, output_filename = pose
+    bh.set_camera_pose(x, y, z, pitch, yaw)
+    bh.render_blender(output_filename=output_filename)
 
 
 def main():
     parser = argparse.ArgumentParser(description="Render file from different camera angles.")
     parser.add_argument("blend_file", type=str, help="The Blender file to render.")
+    parser.add_argument("--workers", type=int, default=1, help="The number of parallel rendering processes.")
     args = parser.parse_args()
 
-    bh.load_blender_file(args.blend_file)
-
-    for angle in range(-80, 20, 10):
-        bh.set_camera_pose(20, -20, 20, math.radians(angle), math.radians(40))
-        bh.render_blender(output_filename=args.blend_file.replace(".blend", f"_pitch_{angle}.png"))
+    pitch_angles = np.arange(-80, 20, 10)
+    pitch_angles_rad = np.deg2rad(pitch_angles)
+    fixed_pitch_rad, yaw_rad = np.deg2rad([-40.0, 40.0])
+    poses = [
+        (20, -20, 20, pitch, yaw_rad, args.blend_file.replace(".blend", f"_pitch_{angle}.png"))
+        for angle, pitch in zip(pitch_angles, pitch_angles_rad)
+    ]
+    poses += [
+        (20, -20, pos, fixed_pitch_rad, yaw_rad, args.blend_file.replace(".blend", f"_z_{pos}.png"))
+        for pos in range(2, 30, 4)
+    ]
 
-    for pos in range(2, 30, 4):
-        bh.set_camera_pose(20, -20, pos, math.radians(-40), math.radians(40))
-        bh.render_blender(output_filename=args.blend_file.replace(".blend", f"_z_{pos}.png"))
+    if args.workers > 1:
+        # each worker loads the blend file once and renders its share of the poses
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=bh.load_blender_file,
+            initargs=(args.blend_file,),
+        ) as executor:
+            list(executor.map(render_pose, poses))
+    else:
+        bh.load_blender_file(args.blend_file)
+        for pose in poses:
+            render_pose(pose)
 
 
 if __name__ == "__main__":
@@ -15,12 +15,27 @@
 
 # PYTHON_ARGCOMPLETE_OK
 import argparse
-import math
-import random
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import argcomplete
 import enlighten
 import lunasynth.blender_helper as bh
+import numpy as np
+
+
+def render_case(case: dict, camera_x: float, camera_y: float) -> None:
+    bh.set_camera_pose(
+        camera_x,
+        camera_y,
+        case["z"],
+        case["camera_pitch_rad"],
+        case["camera_azimuth_rad"],
+    )
+    bh.set_sun_orientation(case["sun_elevation_rad"], case["sun_azimuth_rad"])
+    bh.render_blender(
+        output_filename=case["rgb_filename"],
+    )
 
 
 def main() -> None:
@@ -43,10 +58,10 @@ def main() -> None:
         default=30,
         help="The maximum sun elevation angle.",
     )
+    parser.add_argument("--workers", type=int, default=1, help="The number of parallel rendering processes.")
     argcomplete.autocomplete(parser)
     args = parser.parse_args()
 
-    bh.load_blender_file(args.blend_file)
     camera_x = 0
     camera_y = 0
     params_used = {
@@ -66,6 +81,41 @@ def main() -> None:
         "cases": args.cases,
         "cases_data": [],
     }
+    # sample all the cases at once
+    rng = np.random.default_rng()
+    camera_pitches = rng.uniform(args.min_pitch, args.max_pitch, size=args.cases)
+    camera_azimuths = rng.uniform(0, 360, size=args.cases)
+    camera_zs = rng.uniform(args.min_z, args.max_z, size=args.cases)
+    sun_elevations = rng.uniform(args.min_sun_elevation, args.max_sun_elevation, size=args.cases)
+    sun_azimuths = rng.uniform(0, 360, size=args.cases)
+    camera_pitches_rad = np.deg2rad(camera_pitches)
+    camera_azimuths_rad = np.deg2rad(camera_azimuths)
+    sun_elevations_rad = np.deg2rad(sun_elevations)
+    sun_azimuths_rad = np.deg2rad(sun_azimuths)
+    cases_radians = []
+    for i in range(args.cases):
+        params_used["cases_data"].append(
+            {
+                "case": i,
+                "camera_pitch": float(camera_pitches[i]),
+                "camera_azimuth": float(camera_azimuths[i]),
+                "z": float(camera_zs[i]),
+                "sun_elevation": float(sun_elevations[i]),
+                "sun_azimuth": float(sun_azimuths[i]),
+                "rgb_filename": args.blend_file.replace(".blend", f"_{i}.png"),
+            }
+        )
+        cases_radians.append(
+            {
+                "z": float(camera_zs[i]),
+                "camera_pitch_rad": float(camera_pitches_rad[i]),
+                "camera_azimuth_rad": float(camera_azimuths_rad[i]),
+                "sun_elevation_rad": float(sun_elevations_rad[i]),
+                "sun_azimuth_rad": float(sun_azimuths_rad[i]),
+                "rgb_filename": params_used["cases_data"][i]["rgb_filename"],
+            }
+        )
+
     manager = enlighten.get_manager()
     # status_bar = manager.status_bar(
     #     status_format=f"Processing {args.blend_file}",
@@ -77,43 +127,29 @@ def main() -> None:
         autorefresh=True,
     )
 
-    for i in range(args.cases):
-        camera_pitch = random.uniform(args.min_pitch, args.max_pitch)
-        camera_azimuth = random.uniform(0, 360)
-        camera_z = random.uniform(args.min_z, args.max_z)
-        sun_elevation = random.uniform(args.min_sun_elevation, args.max_sun_elevation)
-        sun_azimuth = random.uniform(0, 360)
-        rgb_filename = args.blend_file.replace(".blend", f"_{i}.png")
-        params_used["cases_data"].append(
-            {
-                "case": i,
-                "camera_pitch": camera_pitch,
-                "camera_azimuth": camera_azimuth,
-                "z": camera_z,
-                "sun_elevation": sun_elevation,
-                "sun_azimuth": sun_azimuth,
-                "rgb_filename": rgb_filename,
-            }
-        )
-        pbar.refresh()
-        data_bar.update(
-            f" Case {i}: using pitch: {camera_pitch}, azimuth: {camera_azimuth}, z: {camera_z}, "
-            f"sun_elevation: {sun_elevation}, sun_azimuth: {sun_azimuth}"
-        )
-        data_bar.refresh()
-
-        bh.set_camera_pose(
-            camera_x,
-            camera_y,
-            camera_z,
-            math.radians(camera_pitch),
-            math.radians(camera_azimuth),
-        )
-        bh.set_sun_orientation(math.radians(sun_elevation), math.radians(sun_azimuth))
-        bh.render_blender(
-            output_filename=rgb_filename,
-        )
-        pbar.update()
+    if args.workers > 1:
+        # each worker loads the blend file once and renders its share of the cases
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=bh.load_blender_file,
+            initargs=(args.blend_file,),
+        ) as executor:
+            futures = [executor.submit(render_case, case, camera_x, camera_y) for case in cases_radians]
+            for future in as_completed(futures):
+                future.result()
+                pbar.update()
+    else:
+        bh.load_blender_file(args.blend_file)
+        for case, case_radians in zip(params_used["cases_data"], cases_radians):
+            pbar.refresh()
+            data_bar.update(
+                f" Case {case['case']}: using pitch: {case['camera_pitch']}, azimuth: {case['camera_azimuth']}, "
+                f"z: {case['z']}, sun_elevation: {case['sun_elevation']}, sun_azimuth: {case['sun_azimuth']}"
+            )
+            data_bar.refresh()
+            render_case(case_radians, camera_x, camera_y)
+            pbar.update()
     pbar.close()
     manager.stop()
 
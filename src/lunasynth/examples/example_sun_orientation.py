@@ -14,25 +14,50 @@
 #  limitations under the License.
 
 import argparse
-import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 import lunasynth.blender_helper as bh
+import numpy as np
+
+
+def render_sun_orientation(orientation: tuple[float, float, str]) -> None:
+    elevation, azimuth, output_filename = orientation
+    bh.set_sun_orientation(elevation, azimuth)
+    bh.render_blender(output_filename=output_filename)
 
 
 def main():
     parser = argparse.ArgumentParser(description="Render file from different sun angles.")
     parser.add_argument("blend_file", type=str, help="The Blender file to render.")
+    parser.add_argument("--workers", type=int, default=1, help="The number of parallel rendering processes.")
     args = parser.parse_args()
 
-    bh.load_blender_file(args.blend_file)
-
-    for angle in range(10, 60, 10):
-        bh.set_sun_orientation(math.radians(angle), 0)
-        bh.render_blender(output_filename=args.blend_file.replace(".blend", f"_{angle}deg_elevation.png"))
+    elevation_angles = np.arange(10, 60, 10)
+    azimuth_angles = np.arange(0, 360, 10)
+    fixed_elevation_rad = np.deg2rad(30.0)
+    orientations = [
+        (elevation, 0, args.blend_file.replace(".blend", f"_{angle}deg_elevation.png"))
+        for angle, elevation in zip(elevation_angles, np.deg2rad(elevation_angles))
+    ]
+    orientations += [
+        (fixed_elevation_rad, azimuth, args.blend_file.replace(".blend", f"_{angle}deg_azimuth.png"))
+        for angle, azimuth in zip(azimuth_angles, np.deg2rad(azimuth_angles))
+    ]
 
-    for angle in range(0, 360, 10):
-        bh.set_sun_orientation(math.radians(30.0), math.radians(angle))
-        bh.render_blender(output_filename=args.blend_file.replace(".blend", f"_{angle}deg_azimuth.png"))
+    if args.workers > 1:
+        # each worker loads the blend file once and renders its share of the sun orientations
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=bh.load_blender_file,
+            initargs=(args.blend_file,),
+        ) as executor:
+            list(executor.map(render_sun_orientation, orientations))
+    else:
+        bh.load_blender_file(args.blend_file)
+        for orientation in orientations:
+            render_sun_orientation(orientation)
 
 
 if __name__ == "__main__":
@@ -32,9 +32,9 @@ def main():
         print(list(f.keys()))
         depth = f["V"][:]
 
-    # show depth map
-    depth[depth > 1000] = np.nan
-    plt.imshow(depth, cmap="magma")
+    # show depth map, leaving the background (depth > 1000) transparent without touching the data
+    cmap = plt.get_cmap("magma").with_extremes(over="none")
+    plt.imshow(depth, cmap=cmap, vmin=np.nanmin(depth), vmax=min(np.nanmax(depth), 1000))
     plt.colorbar()
     plt.show()
 
@@ -30,22 +30,37 @@ def main():
     segmentation_image = np.array(segmentation_image)  # convert to 2D array
     print(f"Segmentation image shape: {segmentation_image.shape}")
 
+    number_colors_steps = 255
+
     # Count how many different values are in the image
     if len(segmentation_image.shape) == 3:
-        flat_image = segmentation_image.reshape(-1, 3)
+        flat_image = segmentation_image.reshape(-1, segmentation_image.shape[2])
     else:
         flat_image = segmentation_image.reshape(-1, 1)
     npixels, nchannels = flat_image.shape
-    unique_values = np.unique(flat_image, axis=0)
-
-    number_colors_steps = 255
+    flat_image_uint8 = np.rint(flat_image * number_colors_steps).astype(np.uint8)
+    if nchannels <= 4 and np.array_equal(flat_image_uint8 / np.float32(number_colors_steps), flat_image):
+        # 8-bit image: count the classes on integer codes, one byte per channel packed into an uint32
+        if nchannels == 1:
+            counts = np.bincount(flat_image_uint8.ravel(), minlength=number_colors_steps + 1)
+            codes = np.nonzero(counts)[0]
+            counts = counts[codes]
+        else:
+            packed = np.zeros(npixels, dtype=np.uint32)
+            for channel in range(nchannels):
+                packed |= flat_image_uint8[:, channel].astype(np.uint32) << (8 * (nchannels - 1 - channel))
+            codes, counts = np.unique(packed, return_counts=True)
+        shifts = 8 * np.arange(nchannels - 1, -1, -1, dtype=np.uint32)
+        unique_values = ((codes[:, None] >> shifts) & 0xFF) / np.float32(number_colors_steps)
+    else:
+        unique_values, counts = np.unique(flat_image, axis=0, return_counts=True)
+    percentages = counts / npixels
 
     [print(f"{value*number_colors_steps}") for value in unique_values]
 
     # what percentage of the image is each value
     print(f"{len(unique_values)} unique values")
-    for value in unique_values:
-        percentage = np.sum(flat_image == value) / npixels / nchannels
+    for value, percentage in zip(unique_values, percentages):
         print(f"{value}: {percentage:.2%}")
 
     plt.matshow(segmentation_image)  # display image
@@ -13,6 +13,7 @@
 #  limitations under the License.
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
 
 zref = 550.0
 x = np.array([-300.0, 0.0, zref])
@@ -52,11 +53,8 @@ plt.axis("equal")
 plt.grid()
 plt.savefig("trajectory.png", dpi=600)
 
-# Save trajectory to file
-np.savetxt(
-    "trajectory.csv",
-    x_array,
-    delimiter=",",
-    header="t,camera_x,camera_y,camera_z,camera_pitch,camera_yaw",
-    comments="",
+# Save trajectory to file, as binary for numpy consumers and as csv for generate_traj_definition
+np.save("trajectory.npy", x_array)
+pd.DataFrame(x_array, columns=["t", "camera_x", "camera_y", "camera_z", "camera_pitch", "camera_yaw"]).to_csv(
+    "trajectory.csv", index=False, float_format="%.9g"
 )
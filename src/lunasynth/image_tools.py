@@ -15,7 +15,9 @@
 
 import math
 import os
-from copy import copy
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import cv2
@@ -24,9 +26,13 @@ import Imath  # another OpenEXR library
 import matplotlib.pyplot as plt
 import numpy as np
 import OpenEXR
-from PIL import Image
 from tqdm import tqdm
 
+try:
+    import imagecodecs  # optional, faster PNG decoding (libspng)
+except ImportError:
+    imagecodecs = None
+
 
 def load_exr(file_path: str):
     """Load an EXR file and return the image data and channel names.
@@ -37,7 +43,7 @@ def load_exr(file_path: str):
 
     Returns:
     -------
-        np.ndarray: The image data.
+        np.ndarray: The image data in channel-first (C, H, W) layout.
         list[str]: The channel names.
 
     """
@@ -55,13 +61,11 @@ def load_exr(file_path: str):
     # Define the channels
     channels = list(header["channels"].keys())
 
-    # Create an array to hold the image data
-    img = np.zeros((height, width, len(channels)), dtype=np.float32)
-
-    # Read the data for each channel
-    for i, channel in enumerate(channels):
-        channel_data = exr_file.channel(channel, Imath.PixelType(Imath.PixelType.FLOAT))
-        img[:, :, i] = np.frombuffer(channel_data, dtype=np.float32).reshape((height, width))
+    # Read all channels at once, each one lands in its own contiguous plane
+    raw_channels = exr_file.channels(channels, Imath.PixelType(Imath.PixelType.FLOAT))
+    img = np.empty((len(channels), height, width), dtype=np.float32)
+    for i, channel_data in enumerate(raw_channels):
+        img[i].reshape(-1)[:] = np.frombuffer(channel_data, dtype=np.float32)
 
     return img, channels
 
@@ -103,33 +107,71 @@ def overlay_images(
     if margin < scale:
         print(f"Warning: margin {margin} is greater than scale {scale}, image might not be visible.")
 
-    # Open the base image
-    base_image = Image.open(base_image_path).convert("RGBA")
-
-    # Open the overlay image
-    overlay_image = Image.open(overlay_image_path).convert("RGBA")
+    # Open the base and overlay images as BGRA
+    base_image = to_bgra(cv2.imread(str(base_image_path), cv2.IMREAD_UNCHANGED))
+    overlay_image = to_bgra(cv2.imread(str(overlay_image_path), cv2.IMREAD_UNCHANGED))
 
     # Scale the overlay image to a percentage of the base image size
-    base_width, base_height = base_image.size
-    overlay_image = overlay_image.resize((int(base_width * scale), int(base_height * scale)), Image.Resampling.LANCZOS)
-
-    # Rotate the overlay image
-    overlay_image = overlay_image.rotate(math.degrees(rotation), expand=True)
+    base_height, base_width = base_image.shape[:2]
+    overlay_image = cv2.resize(
+        overlay_image,
+        (int(base_width * scale), int(base_height * scale)),
+        interpolation=cv2.INTER_LANCZOS4,
+    )
 
-    # Calculate position to paste the overlay image (top right corner with margin)
-    overlay_width, overlay_height = overlay_image.size
-    position = (
-        int(base_width * (1 - margin) - overlay_width / 2),
-        int(base_height * margin - overlay_height / 2),
+    # Rotate the overlay image, expanding the canvas so that it is not cropped
+    height, width = overlay_image.shape[:2]
+    rotation_matrix = cv2.getRotationMatrix2D((width / 2, height / 2), math.degrees(rotation), 1.0)
+    cos_a = abs(rotation_matrix[0, 0])
+    sin_a = abs(rotation_matrix[0, 1])
+    rotated_width = int(math.ceil(height * sin_a + width * cos_a))
+    rotated_height = int(math.ceil(height * cos_a + width * sin_a))
+    rotation_matrix[0, 2] += (rotated_width - width) / 2
+    rotation_matrix[1, 2] += (rotated_height - height) / 2
+    overlay_image = cv2.warpAffine(
+        overlay_image,
+        rotation_matrix,
+        (rotated_width, rotated_height),
+        flags=cv2.INTER_LINEAR,
+        borderMode=cv2.BORDER_CONSTANT,
+        borderValue=(0, 0, 0, 0),
     )
 
-    # Create a new image with the same size as the base image and an alpha layer (transparent)
-    combined_image = Image.new("RGBA", base_image.size)
-    combined_image.paste(base_image, (0, 0))
-    combined_image.paste(overlay_image, position, overlay_image)
+    # Calculate position to paste the overlay image (top right corner with margin)
+    overlay_height, overlay_width = overlay_image.shape[:2]
+    x0 = int(base_width * (1 - margin) - overlay_width / 2)
+    y0 = int(base_height * margin - overlay_height / 2)
+
+    # Clip the overlay to the part that falls inside the base image
+    bx0, by0 = max(x0, 0), max(y0, 0)
+    bx1, by1 = min(x0 + overlay_width, base_width), min(y0 + overlay_height, base_height)
+    if bx0 < bx1 and by0 < by1:
+        overlay_roi = overlay_image[by0 - y0 : by1 - y0, bx0 - x0 : bx1 - x0].astype(np.float32)
+        base_roi = base_image[by0:by1, bx0:bx1]
+        alpha = overlay_roi[..., 3:4] / 255.0
+        base_roi[...] = (alpha * overlay_roi + (1 - alpha) * base_roi).astype(np.uint8)
 
     # Save the combined image
-    combined_image.save(output_path, format="PNG")
+    cv2.imwrite(str(output_path), base_image)
+
+
+def to_bgra(image: np.ndarray) -> np.ndarray:
+    """Convert a grayscale, BGR or BGRA image to BGRA.
+
+    Args:
+    ----
+        image (np.ndarray): The image as read by cv2.imread with IMREAD_UNCHANGED.
+
+    Returns:
+    -------
+        np.ndarray: The image with 4 channels.
+
+    """
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGRA)
+    if image.shape[2] == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+    return image
 
 
 def display_exr(img: np.ndarray, channels: list[str]) -> None:
@@ -137,16 +179,17 @@ def display_exr(img: np.ndarray, channels: list[str]) -> None:
 
     Args:
     ----
-        img (np.ndarray): The image data.
+        img (np.ndarray): The image data in channel-first (C, H, W) layout.
         channels (list[str]): The channel names.
 
     """
+    # values higher than 100 are left transparent by the colormap instead of being masked in the data,
+    # so the caller's array is not modified
+    cmap = plt.get_cmap("magma").with_extremes(over="none")
+
     # Plot each channel
     if len(channels) == 1:
-        # write as nan values higher than 100
-        img[img > 100] = np.nan
-
-        plt.imshow(img[:, :, 0], cmap="magma")
+        plt.imshow(img[0], cmap=cmap, vmin=np.nanmin(img[0]), vmax=min(np.nanmax(img[0]), 100))
         plt.title(f"Channel: {channels}")
         plt.colorbar()
         plt.axis("off")
@@ -154,9 +197,7 @@ def display_exr(img: np.ndarray, channels: list[str]) -> None:
         # img = np.clip(img, 0, 1)
         for i, channel in enumerate(channels):
             plt.subplot(1, len(channels), i + 1)
-            img_i = img[:, :, i]
-            img_i[img_i > 100] = np.nan
-            plt.imshow(img_i, cmap="magma")
+            plt.imshow(img[i], cmap=cmap, vmin=np.nanmin(img[i]), vmax=min(np.nanmax(img[i]), 100))
             plt.title(f"Channel: {channel}")
             plt.colorbar()
             plt.axis("off")
@@ -164,10 +205,21 @@ def display_exr(img: np.ndarray, channels: list[str]) -> None:
     plt.show()
 
 
-def save_to_hdf5(img: np.ndarray, channels: list[str], output_file: str):
+def save_to_hdf5(img: np.ndarray, channels: list[str], output_file: str, tile_size: int = 256):
+    """Save each channel of a (C, H, W) image as a chunked, LZF compressed dataset.
+
+    Args:
+    ----
+        img (np.ndarray): The image data in channel-first (C, H, W) layout.
+        channels (list[str]): The channel names, used as dataset names.
+        output_file (str): The HDF5 file to write.
+        tile_size (int): The chunk size along each image axis.
+
+    """
+    chunks = (min(tile_size, img.shape[1]), min(tile_size, img.shape[2]))
     with h5py.File(output_file, "w") as f:
         for i, channel in enumerate(channels):
-            f.create_dataset(channel, data=img[:, :, i])
+            f.create_dataset(channel, data=img[i], chunks=chunks, compression="lzf", shuffle=True)
         f.attrs["channels"] = list(channels)
 
 
@@ -183,6 +235,26 @@ def get_frame_number(filename: str) -> int:
     return frame_number
 
 
+def get_frame_numbers(filenames: list[str]) -> np.ndarray:
+    """Extract the frame numbers from many filenames at once.
+
+    Same parsing as `get_frame_number`, using NumPy string operations on the whole list.
+
+    Args:
+    ----
+        filenames (list[str]): The filenames of the frames.
+
+    Returns:
+    -------
+        np.ndarray: The frame numbers as int64.
+
+    """
+    if len(filenames) == 0:
+        return np.empty(0, dtype=np.int64)
+    suffixes = np.char.rpartition(np.asarray(filenames), "_")[:, 2]
+    return np.char.partition(suffixes, ".")[:, 0].astype(np.int64)
+
+
 def get_color_space(frame: np.ndarray) -> str:
     """Get the color space of the frame.
 
@@ -206,137 +278,428 @@ def get_color_space(frame: np.ndarray) -> str:
     return "unknown"
 
 
+def read_frame(filename: str | np.ndarray) -> np.ndarray | None:
+    """Read a frame as an 8-bit BGR image, like cv2.imread with IMREAD_COLOR.
+
+    PNG frames are decoded with imagecodecs (libspng) when it is installed, otherwise with OpenCV.
+    Frames that are already decoded, such as rows of a packed frames file, are returned as is.
+
+    Parameters
+    ----------
+        filename (str | np.ndarray): The image file to read, or an already decoded frame.
+
+    Returns
+    -------
+        np.ndarray | None: The frame, or None if it could not be read.
+
+    """
+    if isinstance(filename, np.ndarray):
+        return filename
+    if imagecodecs is None or not filename.endswith(".png"):
+        return cv2.imread(filename, cv2.IMREAD_COLOR)
+    try:
+        frame = imagecodecs.imread(filename)
+    except Exception:
+        return None
+    if frame.dtype == np.uint16:
+        frame = (frame >> 8).astype(np.uint8)
+    if frame.ndim == 2:
+        return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
+    return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+
+
+def render_text_mask(text: str, font: int, font_scale: float, font_thickness: int) -> tuple[np.ndarray, int, int, int]:
+    """Rasterize a text once with cv2.putText into a boolean mask.
+
+    Parameters
+    ----------
+        text (str): The text to rasterize.
+        font (int): The OpenCV font face.
+        font_scale (float): The font scale.
+        font_thickness (int): The line thickness.
+
+    Returns
+    -------
+        np.ndarray: The mask, True where the text is drawn.
+        int: The x position of the text origin in the mask.
+        int: The y position of the text origin (baseline) in the mask.
+        int: The advance, the distance to the origin of a text drawn right after this one.
+
+    """
+    (text_width, text_height), baseline = cv2.getTextSize(text, font, font_scale, font_thickness)
+    pad = 2 * font_thickness
+    origin_x, origin_y = pad, pad + text_height
+    mask_image = np.zeros((text_height + baseline + 2 * pad, text_width + 2 * pad), dtype=np.uint8)
+    cv2.putText(mask_image, text, (origin_x, origin_y), font, font_scale, 255, font_thickness)
+    return mask_image > 0, origin_x, origin_y, text_width - font_thickness
+
+
+def stamp_text_mask(
+    image: np.ndarray,
+    text_mask: tuple[np.ndarray, int, int, int],
+    x: int,
+    y: int,
+    color: tuple[int, int, int],
+) -> None:
+    """Paint a text mask from `render_text_mask` on an image, clipped to the image bounds.
+
+    Parameters
+    ----------
+        image (np.ndarray): The image to paint on, modified in place.
+        text_mask (tuple[np.ndarray, int, int, int]): The output of `render_text_mask`.
+        x (int): The x position of the text origin in the image.
+        y (int): The y position of the text origin (baseline) in the image.
+        color (tuple[int, int, int]): The text color.
+
+    """
+    mask, origin_x, origin_y, _ = text_mask
+    top = y - origin_y
+    left = x - origin_x
+    y0, x0 = max(top, 0), max(left, 0)
+    y1 = min(top + mask.shape[0], image.shape[0])
+    x1 = min(left + mask.shape[1], image.shape[1])
+    if y0 < y1 and x0 < x1:
+        image[y0:y1, x0:x1][mask[y0 - top : y1 - top, x0 - left : x1 - left]] = color
+
+
+def combined_frames_shape(
+    n_frames: int, n_cameras: int, frame__image_size: tuple[int, int], border_size: int
+) -> tuple[int, int, int, int]:
+    """Get the shape of the array holding all the frames combined by `combine_frames`.
+
+    Parameters
+    ----------
+        n_frames (int): The number of frames.
+        n_cameras (int): The number of cameras.
+        frame__image_size (tuple[int, int]): The size of the frames of each camera.
+        border_size (int): The border size around each camera frame.
+
+    Returns
+    -------
+        tuple[int, int, int, int]: The (N, H, W, 3) shape.
+
+    """
+    width, height = frame__image_size
+    return n_frames, height + 2 * border_size, n_cameras * (width + 2 * border_size), 3
+
+
 def combine_frames(
     prefixes: list[str],
-    images: dict[str, dict[int, str]],
+    images: dict[str, dict[int, str | np.ndarray]],
     frame_set_sorted: list,
     frame__image_size: tuple[int, int] = (640, 480),
     add_frame_text: bool = True,
     border_size: int = 4,
     border_color: tuple[int, int, int] = (0, 0, 0),
-) -> list[np.ndarray]:
+    max_prefetch: int = 4,
+    out: np.ndarray | None = None,
+) -> Iterator[np.ndarray]:
     """Combine the frames from multiple cameras into a single frame.
 
+    This is a generator, the combined frames are yielded one at a time. Frames are decoded in a thread
+    pool, up to `max_prefetch` frame indices ahead of the one being combined, and resized straight into
+    their bordered tile of the combined frame.
+
     Parameters
     ----------
         prefixes (list[str]): The prefixes of the cameras.
-        images (dict[str, dict[int, str]]): The images from each camera.
+        images (dict[str, dict[int, str | np.ndarray]]): The image files (or packed frames) from each camera.
         frame_set_sorted (set): The set of frame indices.
         frame__image_size (tuple[int, int]): The size of the frames.
+        max_prefetch (int): The number of frame indices to read ahead.
+        out (np.ndarray | None): Optional preallocated array with shape `combined_frames_shape(...)`, the
+            combined frames are written into it and views of it are yielded instead of new arrays.
+
+    Yields
+    ------
+        np.ndarray: The combined frame for each frame index.
+
+    """
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    font_scale = 1
+    font_thickness = 2
+    text_color = (255, 255, 255)
+
+    # The label "{prefix} - {frame_index}" is stamped from masks rasterized once: the static
+    # "{prefix} - " part per camera, followed by one mask per character of the frame index
+    char_masks = {char: render_text_mask(char, font, font_scale, font_thickness) for char in "-0123456789"}
+
+    if out is not None:
+        expected_shape = combined_frames_shape(len(frame_set_sorted), len(prefixes), frame__image_size, border_size)
+        if out.shape != expected_shape:
+            msg = f"Output array has shape {out.shape}, expected {expected_shape}"
+            raise ValueError(msg)
+
+    # The combined frame is a single canvas filled once with the border color, each camera owns the
+    # interior of its tile, which is overwritten by every new frame. When a frame cannot be read the tile
+    # still holds the previous one (black until the first frame is read).
+    width, height = frame__image_size
+    tile_width = width + 2 * border_size
+    canvas = np.empty((height + 2 * border_size, len(prefixes) * tile_width, 3), dtype=np.uint8)
+    canvas[...] = border_color
+
+    # Per camera invariants: the text height only depends on the prefix
+    text_y = {}
+    label_masks = {}
+    canvas_interior = {}
+    for i, prefix in enumerate(prefixes):
+        label_masks[prefix] = render_text_mask(f"{prefix} - ", font, font_scale, font_thickness)
+        text_height = cv2.getTextSize(prefix, font, font_scale, font_thickness)[0][1]
+        text_y[prefix] = height - text_height + 10
+        x0 = i * tile_width + border_size
+        canvas_interior[prefix] = canvas[border_size : border_size + height, x0 : x0 + width]
+        canvas_interior[prefix][...] = 0
+
+    # Iterate over the frames, OpenCV releases the GIL while decoding so threads are enough
+    frame_indices = iter(frame_set_sorted)
+    with ThreadPoolExecutor(max_workers=2 * len(prefixes)) as executor:
+
+        def submit_reads(frame_index: int) -> tuple[int, dict]:
+            return frame_index, {
+                prefix: executor.submit(read_frame, images[prefix][frame_index]) for prefix in prefixes
+            }
+
+        pending = deque(submit_reads(frame_index) for _, frame_index in zip(range(max(max_prefetch, 1)), frame_indices))
+        for i in tqdm(range(len(frame_set_sorted)), desc="Reading frames..", unit="frames"):
+            frame_index, futures = pending.popleft()
+            next_frame_index = next(frame_indices, None)
+            if next_frame_index is not None:
+                pending.append(submit_reads(next_frame_index))
+
+            # Combine the frame from each camera
+            for prefix in prefixes:
+                frame = futures[prefix].result()
+                if frame is None:
+                    # keep the previous frame, it is still in the canvas
+                    print(f"Could not read frame {frame_index} from camera {prefix}")
+                    continue
+
+                cv2.resize(frame, frame__image_size, dst=canvas_interior[prefix])
+                if add_frame_text:
+                    # add text "{prefix} - {frame_index}" to the bottom middle of the frame
+                    text_masks = [label_masks[prefix]] + [char_masks[char] for char in str(frame_index)]
+                    text_width = sum(text_mask[3] for text_mask in text_masks) + font_thickness
+                    text_x = (width - text_width) // 2
+                    for text_mask in text_masks:
+                        stamp_text_mask(canvas_interior[prefix], text_mask, text_x, text_y[prefix], text_color)
+                        text_x += text_mask[3]
+
+            # The frames are already side by side in the canvas, yield a copy so the canvas can be reused
+            if out is None:
+                yield canvas.copy()
+            else:
+                out[i] = canvas
+                yield out[i]
+
+
+# fourcc codes and capture backends tried in order when opening a video writer
+VIDEO_ENCODERS = (
+    ("avc1", cv2.CAP_FFMPEG),
+    ("H264", cv2.CAP_FFMPEG),
+    ("mp4v", cv2.CAP_ANY),
+)
+
+
+def open_video_writer(
+    output_file: str,
+    fps: int,
+    frame_size: tuple[int, int],
+    encoder: str | None = None,
+) -> cv2.VideoWriter:
+    """Open a video writer with the first encoder that is available.
+
+    H.264 (`avc1`/`H264`) through FFmpeg is preferred, falling back to MPEG-4 Part 2 (`mp4v`) which is
+    always available. H.264 needs an FFmpeg build with an H.264 encoder (e.g. openh264) at runtime.
+
+    Parameters
+    ----------
+        output_file (str): The output file to write the video to.
+        fps (int): The frames per second of the video.
+        frame_size (tuple[int, int]): The (width, height) of the frames.
+        encoder (str | None): The fourcc code to use, if None the encoders in VIDEO_ENCODERS are tried in order.
 
     Returns
     -------
-        list[np.ndarray]: The combined frames.
+        cv2.VideoWriter: The opened video writer.
 
     """
-    previous_frame = {}
-    for prefix in prefixes:
-        first_image = cv2.imread(images[prefix][frame_set_sorted[0]])
-        if first_image is None:
-            print(f"Could not read first frame from camera {prefix}")
-            first_image = np.zeros(frame__image_size + (3,), dtype=np.uint8)
-        else:
-            previous_frame[prefix] = cv2.resize(first_image, frame__image_size)
-
-    # Iterate over the frames
-    output_frames = []
-    for frame_index in tqdm(frame_set_sorted, desc="Reading frames..", unit="frames"):
-        frames = []
-
-        # Read each frame from each camera
-        for prefix in prefixes:
-            frame = cv2.imread(images[prefix][frame_index])
-            # print(f"{prefix}: frame color space: {get_color_space(frame)}")
-            if frame is None:
-                print(f"Could not read frame {frame_index} from camera {prefix}")
-                frame = previous_frame[prefix]
-
-            if len(frame.shape) == 2:  # If the frame is grayscale, convert it to BGR
-                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
-
-            # Resize the frame if necessary
-            frame = cv2.resize(frame, frame__image_size)
-            if add_frame_text:
-                # add text "{prefix} - {frame_index}" to the bottom middle of the frame
-                text = f"{prefix} - {frame_index}"
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                font_scale = 1
-                font_thickness = 2
-                text_size = cv2.getTextSize(text, font, font_scale, font_thickness)[0]
-                text_x = (frame__image_size[0] - text_size[0]) // 2
-                text_y = frame__image_size[1] - text_size[1] + 10
-                text_color = (255, 255, 255)
-                cv2.putText(
-                    frame,
-                    text,
-                    (text_x, text_y),
-                    font,
-                    font_scale,
-                    text_color,
-                    font_thickness,
-                )
-
-            if border_size > 0:
-                frame = cv2.copyMakeBorder(
-                    frame,
-                    border_size,
-                    border_size,
-                    border_size,
-                    border_size,
-                    cv2.BORDER_CONSTANT,
-                    value=border_color,
-                )
-            frames.append(frame)
-            previous_frame[prefix] = frame
-
-        # Concatenate the frames side by side
-        combined_frame = cv2.hconcat(frames)
-        output_frames.append(copy(combined_frame))
-    return output_frames
+    encoders = VIDEO_ENCODERS if encoder is None else ((encoder, cv2.CAP_ANY),)
+    for fourcc_code, backend in encoders:
+        fourcc = cv2.VideoWriter_fourcc(*fourcc_code)  #  type: ignore[attr-defined]
+        vidwriter = cv2.VideoWriter(output_file, backend, fourcc, fps, frame_size)
+        if vidwriter.isOpened():
+            print(f"Writing video with encoder {fourcc_code}")
+            return vidwriter
+        vidwriter.release()
+    msg = f"Could not open a video writer for {output_file} with encoders {[code for code, _ in encoders]}"
+    raise RuntimeError(msg)
 
 
 def save_video(
-    output_frames: list[np.ndarray],
+    output_frames: Iterable[np.ndarray],
     output_file: str,
     fps: int = 30,
+    encoder: str | None = None,
 ) -> None:
     """Save the frames to a video file.
 
+    The frames are written as they are produced, so a generator such as `combine_frames` is never
+    materialized in memory.
+
     Parameters
     ----------
-        output_frames (list[np.ndarray]): The frames to save.
+        output_frames (Iterable[np.ndarray]): The frames to save.
         output_file (str): The output file to write the video to.
-        frame__image_size (tuple[int, int]): The size of the frames.
         fps (int): The frames per second of the video.
+        encoder (str | None): The fourcc code to use, by default the best available one, see `open_video_writer`.
 
     """
-    # frame__image_size = (output_frames[0].shape[1], output_frames[0].shape[0])
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")  #  type: ignore[attr-defined]
-    frame_combined_size = (output_frames[0].shape[1], output_frames[0].shape[0])
-    print(f"Combined frame size: {frame_combined_size}")
-    vidwriter = cv2.VideoWriter(output_file, fourcc, fps, frame_combined_size)
+    vidwriter = None
     for frame in tqdm(output_frames, desc="Writing frames..", unit="frames"):
+        if vidwriter is None:
+            # the writer needs the frame size, so it is created from the first frame
+            frame_combined_size = (frame.shape[1], frame.shape[0])
+            print(f"Combined frame size: {frame_combined_size}")
+            vidwriter = open_video_writer(output_file, fps, frame_combined_size, encoder)
         vidwriter.write(frame)
+    if vidwriter is None:
+        print("No frames to write.")
+        return
     vidwriter.release()
     print("Video written successfully.")
 
 
-def get_images(data_dir: str, prefixes: list[str], start: int, end: int):
+def packed_frames_paths(data_dir: str, prefix: str) -> tuple[str, str]:
+    """Get the paths of the packed frames and frame numbers files of a camera, see `prepack_frames`."""
+    return (
+        os.path.join(data_dir, f"{prefix}_frames.npy"),
+        os.path.join(data_dir, f"{prefix}_frame_numbers.npy"),
+    )
+
+
+def prepack_frames(data_dir: str, prefix: str, start: int = 0, end: int = -1) -> str:
+    """Decode the PNG frames of a camera once and pack them into a single .npy file.
+
+    The frames are stored as an (N, H, W, 3) BGR uint8 array, next to an array with their frame numbers.
+    `get_images` then memory-maps the packed file instead of listing and decoding the PNGs, so each frame
+    is a zero-copy view. Frames with a different size than the first one are resized to it.
+
+    Args:
+    ----
+        data_dir (str): The directory containing the camera frames, the packed files are written there.
+        prefix (str): The prefix of the camera frames.
+        start (int): The first frame to pack.
+        end (int): The last frame to pack, -1 for all.
+
+    Returns:
+    -------
+        str: The path of the packed frames file.
+
+    """
+    frames_path, frame_numbers_path = packed_frames_paths(data_dir, prefix)
+    # always pack from the PNGs: an existing pack is memory-mapped by get_images and is replaced below
+    images = get_images(data_dir, [prefix], start, end, use_packed=False)[prefix]
+    frame_numbers = sorted(images)
+    if len(frame_numbers) == 0:
+        msg = f"No images found for camera {prefix} in {data_dir}"
+        raise FileNotFoundError(msg)
+
+    # written to temporary files and moved into place, so readers never see a partially written pack
+    tmp_frames_path = f"{frames_path}.tmp"
+    tmp_frame_numbers_path = f"{frame_numbers_path}.tmp"
+    packed = None
+    for i, frame_number in enumerate(tqdm(frame_numbers, desc=f"Packing {prefix}..", unit="frames")):
+        frame = read_frame(images[frame_number])
+        if frame is None:
+            msg = f"Could not read frame {frame_number} from camera {prefix}"
+            raise OSError(msg)
+        if packed is None:
+            packed = np.lib.format.open_memmap(
+                tmp_frames_path, mode="w+", dtype=np.uint8, shape=(len(frame_numbers),) + frame.shape
+            )
+        elif frame.shape != packed.shape[1:]:
+            frame = cv2.resize(frame, (packed.shape[2], packed.shape[1]))
+        packed[i] = frame
+    packed.flush()
+    del packed
+    with open(tmp_frame_numbers_path, "wb") as f:
+        np.save(f, np.asarray(frame_numbers, dtype=np.int64))
+    os.replace(tmp_frames_path, frames_path)
+    os.replace(tmp_frame_numbers_path, frame_numbers_path)
+    print(f"Packed {len(frame_numbers)} frames of camera {prefix} to {frames_path}")
+    return frames_path
+
+
+def get_images(data_dir: str, prefixes: list[str], start: int, end: int, use_packed: bool = True):
+    """Find the frames of each camera, as PNG paths or as views of the frames packed by `prepack_frames`.
+
+    Packed frames are used when `use_packed` is set, the pack is newer than every PNG of the camera and it
+    holds the same frames in [start, end] as the PNGs.
+    """
     print(f"Searching for images in {data_dir} for cameras {prefixes}")
-    images: dict[str, dict[int, str]] = {}
+    images: dict[str, dict[int, str | np.ndarray]] = {prefix: {} for prefix in prefixes}
+    # only cameras with a pack need the PNG modification times, the others are listed without a stat call
+    packed_prefixes = set()
+    if use_packed:
+        packed_prefixes = {
+            prefix for prefix in prefixes if all(map(os.path.exists, packed_frames_paths(data_dir, prefix)))
+        }
+    # longest prefixes first, so a file is assigned to the most specific camera when prefixes overlap
+    prefixes_by_length = sorted(prefixes, key=len, reverse=True)
+    filenames: dict[str, list[str]] = {prefix: [] for prefix in prefixes}
+    paths: dict[str, list[str]] = {prefix: [] for prefix in prefixes}
+    newest_png: dict[str, float] = {prefix: 0.0 for prefix in prefixes}
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            filename = entry.name
+            if not filename.endswith(".png"):
+                continue
+            for prefix in prefixes_by_length:
+                if filename.startswith(prefix):
+                    filenames[prefix].append(filename)
+                    paths[prefix].append(entry.path)
+                    if prefix in packed_prefixes:
+                        newest_png[prefix] = max(newest_png[prefix], entry.stat().st_mtime)
+                    break
+
+    def frames_in_range(frame_numbers: np.ndarray) -> np.ndarray:
+        in_range = frame_numbers >= start
+        if end != -1:
+            in_range &= frame_numbers <= end
+        return in_range
+
     for prefix in prefixes:
-        images[prefix] = {}
-        for filename in os.listdir(data_dir):
-            if filename.startswith(prefix) and filename.endswith(".png"):
-                frame_number = get_frame_number(filename)
-                if start <= frame_number and (end == -1 or frame_number <= end):
-                    images[prefix][get_frame_number(filename)] = os.path.join(data_dir, filename)
+        frame_sources: list = paths[prefix]
+        frame_numbers = get_frame_numbers(filenames[prefix])
+        in_range = frames_in_range(frame_numbers)
+        if prefix in packed_prefixes:
+            frames_path, frame_numbers_path = packed_frames_paths(data_dir, prefix)
+            packed_frame_numbers = np.load(frame_numbers_path)
+            packed_in_range = frames_in_range(packed_frame_numbers)
+            if os.path.getmtime(frames_path) < newest_png[prefix]:
+                print(f"Packed frames {frames_path} are older than the PNGs of camera {prefix}, using the PNGs")
+            elif not np.array_equal(packed_frame_numbers[packed_in_range], np.sort(frame_numbers[in_range])):
+                print(f"Packed frames {frames_path} do not match the PNGs of camera {prefix}, using the PNGs")
+            else:
+                # frames packed with prepack_frames, memory-mapped instead of decoded
+                print(f"Using packed frames {frames_path} for camera {prefix}")
+                frame_sources = list(np.load(frames_path, mmap_mode="r"))
+                frame_numbers = packed_frame_numbers
+                in_range = packed_in_range
+        images[prefix] = {
+            frame_number: frame_source
+            for frame_number, frame_source, keep in zip(frame_numbers.tolist(), frame_sources, in_range.tolist())
+            if keep
+        }
 
+    for prefix in prefixes:
         print(f"Found {len(images[prefix])} images for camera {prefix}")
     return images
 
 
-def collect_frame_indices(images: dict[str, dict[int, str]]) -> list[int]:
+def collect_frame_indices(images: dict[str, dict[int, str | np.ndarray]]) -> list[int]:
     frame_set = set()
     for prefix in images.keys():
         frame_index_list = list(images[prefix].keys())
@@ -354,11 +717,12 @@ def create_multiview_video(
     fps: int = 30,
     start: int = 0,
     end: int = -1,
+    encoder: str | None = None,
 ) -> None:
     images = get_images(data_dir, prefixes, start, end)
     frame_set_sorted = collect_frame_indices(images)
     output_frames = combine_frames(prefixes, images, frame_set_sorted, frame_image_size)
-    save_video(output_frames, output_file, fps)
+    save_video(output_frames, output_file, fps, encoder)
 
 
 def export_combine_frames(
@@ -378,18 +742,27 @@ def export_combine_frames(
             return
 
     frame_set_sorted = collect_frame_indices(images)
-    output_frames = combine_frames(prefixes, images, frame_set_sorted, frame_image_size)
     if output_dir is None:
         output_dir = data_dir
     if collage:
+        # the collage needs all the frames at once, combine them into a single preallocated array
+        border_size = 4
+        frames = np.empty(
+            combined_frames_shape(len(frame_set_sorted), len(prefixes), frame_image_size, border_size), dtype=np.uint8
+        )
+        for _ in combine_frames(
+            prefixes, images, frame_set_sorted, frame_image_size, border_size=border_size, out=frames
+        ):
+            pass
         output_filename = str(Path(output_dir) / Path(output_prefix + ".png"))
-        save_collage(output_frames, output_filename)
+        save_collage(frames, output_filename)
     else:
+        output_frames = combine_frames(prefixes, images, frame_set_sorted, frame_image_size)
         save_frames(output_frames, output_dir, output_prefix)
 
 
 def save_collage(
-    output_frames: list[np.ndarray],
+    output_frames: list[np.ndarray] | np.ndarray,
     output_filename: str = "collage.png",
     border_size: int = 10,
     border_color: tuple[int, int, int] = (0, 0, 0),
@@ -398,28 +771,23 @@ def save_collage(
     n_cols = int(np.sqrt(len(output_frames)))
     n_rows = len(output_frames) // n_cols
 
-    if border_size > 0:
-        for i, frame in enumerate(output_frames):
-            output_frames[i] = cv2.copyMakeBorder(
-                frame,
-                border_size,
-                border_size,
-                border_size,
-                border_size,
-                cv2.BORDER_CONSTANT,
-                value=border_color,
-            )
-
-    for r in range(n_rows):
-        for c in range(n_cols):
-            if c == 0:
-                row = output_frames[r * n_cols]
-            else:
-                row = cv2.hconcat([row, output_frames[r * n_cols + c]])
-        if r == 0:
-            collage = row
-        else:
-            collage = cv2.vconcat([collage, row])
+    # write every frame into its tile of a single canvas, the border is the canvas background
+    h, w = output_frames[0].shape[:2]
+    tile_h = h + 2 * border_size
+    tile_w = w + 2 * border_size
+    collage = np.empty((n_rows * tile_h, n_cols * tile_w, 3), dtype=np.uint8)
+    collage[...] = border_color
+    # view of the canvas indexed as (row, y, column, x, channel), the tile interiors exclude the border
+    tiles = collage.reshape(n_rows, tile_h, n_cols, tile_w, 3)[
+        :, border_size : border_size + h, :, border_size : border_size + w
+    ]
+    if isinstance(output_frames, np.ndarray):
+        # stacked frames are written with a single assignment
+        tiles[...] = output_frames[: n_rows * n_cols].reshape(n_rows, n_cols, h, w, 3).transpose(0, 2, 1, 3, 4)
+    else:
+        for r in range(n_rows):
+            for c in range(n_cols):
+                tiles[r, :, c] = output_frames[r * n_cols + c]
 
     # collage = cv2.vconcat(output_frames)
     # create directory if it does not exist
@@ -428,9 +796,38 @@ def save_collage(
     print(f"Saved collage to {output_filename}")
 
 
-def save_frames(output_frames: list[np.ndarray], output_dir: str, output_prefix: str) -> None:
+def save_frames(
+    output_frames: Iterable[np.ndarray],
+    output_dir: str,
+    output_prefix: str,
+    png_compression: int = 1,
+    max_workers: int | None = None,
+) -> None:
+    """Save the frames as numbered PNG files.
+
+    The PNGs are encoded in a thread pool (cv2.imwrite releases the GIL), keeping at most two frames per
+    worker in flight so a generator of frames is not materialized in memory.
+
+    Parameters
+    ----------
+        output_frames (Iterable[np.ndarray]): The frames to save.
+        output_dir (str): The directory to save the frames to.
+        output_prefix (str): The prefix of the frame filenames.
+        png_compression (int): The PNG compression level, from 0 to 9.
+        max_workers (int | None): The number of encoding threads, by default the number of CPUs.
+
+    """
     os.makedirs(output_dir, exist_ok=True)
-    for i, frame in enumerate(output_frames):
-        output_file = f"{output_dir}/{output_prefix}_{i:04d}.png"
-        cv2.imwrite(output_file, frame)
-        print(f"Saved frame {i} to {output_file}")
+    max_workers = max_workers or os.cpu_count() or 1
+    png_params = [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+    n_frames = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: deque = deque()
+        for i, frame in enumerate(output_frames):
+            if len(pending) >= 2 * max_workers:
+                pending.popleft().result()
+            pending.append(executor.submit(cv2.imwrite, f"{output_dir}/{output_prefix}_{i:04d}.png", frame, png_params))
+            n_frames += 1
+        for future in pending:
+            future.result()
+    print(f"Saved {n_frames} frames to {output_dir}/{output_prefix}_*.png")
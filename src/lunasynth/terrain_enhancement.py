@@ -19,7 +19,9 @@ import os
 import random
 import re
 import time
-from dataclasses import asdict, dataclass
+import warnings
+from dataclasses import asdict, dataclass, fields
+from functools import lru_cache
 from pathlib import Path
 
 import bpy
@@ -29,11 +31,12 @@ import lunasynth.dem_tools as dem_tools
 import matplotlib.pyplot as plt
 import numpy as np
 import tqdm
-from mathutils import Vector
+from mathutils import Matrix, Vector
+from mathutils.bvhtree import BVHTree
 from numba import njit, prange
 from scipy.interpolate import (
+    CubicSpline,
     RegularGridInterpolator,  # interp2d is deprecated
-    interp1d,
 )
 
 
@@ -43,7 +46,11 @@ def dth(d: float, minimum_unit: str = "microseconds") -> str:
 
 def cumsumr(v: np.ndarray) -> np.ndarray:
     """Cumsum from the end"""
-    return np.cumsum(v[::-1])[::-1]
+    v = np.asarray(v)
+    # accumulate through a reversed view of the output so the result comes back contiguous, in one pass
+    out = np.empty_like(v, dtype=np.cumsum(v[:0]).dtype)
+    np.cumsum(v[::-1], out=out[::-1])
+    return out
 
 
 @dataclass
@@ -62,25 +69,39 @@ class CfaModel:
         n_points: int = 1000,
         A: float = 0.5648,
         B: float = 0.01285,
+        kind: str = "linear",
     ):
+        """Initializes the model.
+
+        Args:
+        ----
+            value_min (float): The minimum value (e.g. diameter) to generate.
+            value_max (float): The maximum value to generate.
+            density (float): The CFA value as a decimal.
+            n_points (int): The number of points of the tabulated CDF.
+            A (float): The A coefficient of q = A + B/k.
+            B (float): The B coefficient of q = A + B/k.
+            kind (str): The interpolation of the inverse CDF used for sampling, "linear" or "cubic".
+
+        """
+        if kind not in ("linear", "cubic"):
+            msg = f"Unknown interpolation kind: {kind}"
+            raise ValueError(msg)
         self.value_min = value_min
         self.value_max = value_max
         self.density = density
         self.n_points = n_points
         self.A = A
         self.B = B
+        self.kind = kind
 
-    def compute_values(self, area: float, seed: int | None = None) -> tuple[list[float], float]:
+    def compute_values(self, area: float, seed: int | None = None) -> tuple[np.ndarray, float]:
         self.area = area
         if seed is not None:
             np.random.seed(seed)
-        D = np.logspace(np.log10(self.value_min), np.log10(self.value_max), self.n_points)
-        N = self.num_pdf(D, self.density)
+        params = (self.value_min, self.value_max, self.density, self.n_points, self.A, self.B)
+        D, N, NumCDF = cfa_tables(*params)
         d_diff = np.diff(D)
-        NumCDF = np.cumsum(
-            N[:-1] * d_diff,
-        )
-        NumCDF = NumCDF / NumCDF[-1]
 
         self.N = N
         self.D = D
@@ -89,20 +110,36 @@ class CfaModel:
 
         CFA_for_h_min = self.density * np.exp(-q * self.value_min)
 
-        f = interp1d(NumCDF, D[:-1], kind="cubic", fill_value="extrapolate")
+        # inverse CDF, the tabulated CDF is dense enough for linear interpolation to be accurate
+        if self.kind == "cubic":
+            f = cfa_cubic_inverse_cdf(*params)
+        else:
+
+            def f(u: np.ndarray) -> np.ndarray:
+                return sample_inverse_cdf_numba(u, NumCDF, D[:-1])
 
-        dia = []
-        self.computed_CFA = 0.0
-        batch_size = max(int(area / 100), 1)  # to get around 3 batch_iterations
+        # estimate how many values reach CFA_for_h_min from the mean area of a value, and draw twice as
+        # many at once; if it is not enough, keep drawing batches of twice the size
+        number_weights = N[:-1] * d_diff
+        mean_area = np.pi / 4 * np.sum(number_weights * D[:-1] ** 2) / np.sum(number_weights)
+        batch_size = max(int(np.ceil(2 * CFA_for_h_min * area / mean_area)), 1)
+        dia = np.empty(0)
+        CFA_cumsum = np.empty(0)
         batch_iterations = 0
-        while self.computed_CFA < CFA_for_h_min:
+        while len(CFA_cumsum) == 0 or CFA_cumsum[-1] <= CFA_for_h_min:
             batch_iterations += 1
-            dia.extend(list(f(np.random.rand(batch_size))))
-            CFA_cumsum = np.cumsum([np.pi / 4 * d**2 for d in dia]) / area
-            self.computed_CFA = CFA_cumsum[-1]
-
-        # get how many rocks until CFA_for_h_min is reached
-        self.diameters = dia[: np.argmax(CFA_cumsum > CFA_for_h_min)]
+            new_dia = f(np.random.rand(batch_size))
+            new_cumsum = np.cumsum(new_dia * new_dia) * (np.pi / (4 * area))
+            if len(CFA_cumsum) > 0:
+                new_cumsum += CFA_cumsum[-1]
+            dia = np.concatenate((dia, new_dia))
+            CFA_cumsum = np.concatenate((CFA_cumsum, new_cumsum))
+            batch_size *= 2
+        self.computed_CFA = CFA_cumsum[-1]
+
+        # get how many values until CFA_for_h_min is reached
+        n_values = np.searchsorted(CFA_cumsum, CFA_for_h_min, side="right")
+        self.diameters = dia[:n_values]
         if len(self.diameters) == 0:
             print("No rocks generated. Check the input parameters and try again.")
             print(f"Computed CFA: {self.computed_CFA*100:.2f}%")
@@ -113,7 +150,7 @@ class CfaModel:
             print(f"CFA_cumsum: {CFA_cumsum}")
             msg = "No rocks generated. Check the input parameters and try again."
             raise ValueError(msg)
-        self.computed_CFA = (np.cumsum([np.pi / 4 * d**2 for d in self.diameters]) / (area))[-1]
+        self.computed_CFA = CFA_cumsum[n_values - 1]
 
         print(
             f"Generated {len(self.diameters)} values with CFA={self.computed_CFA*100:.2f}%"
@@ -148,8 +185,9 @@ class CfaModel:
         """Plots the cumulative rock size distribution."""
         sorted_diameters = np.sort(self.diameters)
         area_factor = np.pi / 4 / self.area
-        cum_rocks = cumsumr(sorted_diameters**2) * area_factor
-        cum_theoretical = [self.density * np.exp(-self.q(self.density) * d) for d in sorted_diameters]
+        cum_rocks = cumsumr(sorted_diameters**2)
+        cum_rocks *= area_factor
+        cum_theoretical = self.density * np.exp(-self.q(self.density) * sorted_diameters)
 
         self.cfa_fig, self.cfa_ax = plt.subplots()
         self.cfa_ax.loglog(sorted_diameters, cum_rocks, label="Generated Rocks CDF", linewidth=2)
@@ -198,7 +236,7 @@ class CfaModel:
         if show:
             plt.show()
 
-    def num_pdf(self, D: np.ndarray, k: float = 0.05) -> list[float]:
+    def num_pdf(self, D: np.ndarray, k: float = 0.05) -> np.ndarray:
         """Generates a number density function for the rock field.
 
         Parameters
@@ -210,10 +248,11 @@ class CfaModel:
         np.ndarray: An array of number densities for the rock sizes.
 
         """
+        D = np.asarray(D)
         P = self.area_pdf(D, k)
-        return [p / (d**2) * 4 / np.pi for p, d in zip(P, D)]
+        return P * 4.0 / (np.pi * D * D)
 
-    def area_pdf(self, D: np.ndarray, k: float = 0.05) -> list[float]:
+    def area_pdf(self, D: np.ndarray, k: float = 0.05) -> np.ndarray:
         """Generates an area density function for the rock field.
 
         Parameters
@@ -226,7 +265,7 @@ class CfaModel:
 
         """
         q = self.q(k)
-        return [k * q * np.exp(-q * d) for d in D]
+        return k * q * np.exp(-q * np.asarray(D))
 
     def q(self, k: float) -> float:
         """Calculates the q value for a given k value, as q = A + B/k
@@ -243,6 +282,70 @@ class CfaModel:
         return self.A + self.B / k
 
 
+@lru_cache(maxsize=32)
+def cfa_tables(
+    value_min: float, value_max: float, density: float, n_points: int, A: float, B: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Tabulates the number density of a CfaModel and its normalized CDF.
+
+    The tables only depend on the model parameters, so they are cached and shared (read-only) by all the
+    models with the same parameters.
+
+    Returns
+    -------
+        np.ndarray: The values D, log-spaced between value_min and value_max.
+        np.ndarray: The number density at D.
+        np.ndarray: The normalized CDF at D[:-1].
+
+    """
+    D = np.logspace(np.log10(value_min), np.log10(value_max), n_points)
+    N = CfaModel(value_min, value_max, density, n_points, A, B).num_pdf(D, density)
+    NumCDF = np.cumsum(N[:-1] * np.diff(D))
+    NumCDF /= NumCDF[-1]
+    for table in (D, N, NumCDF):
+        table.flags.writeable = False
+    return D, N, NumCDF
+
+
+@lru_cache(maxsize=32)
+def cfa_cubic_inverse_cdf(
+    value_min: float, value_max: float, density: float, n_points: int, A: float, B: float
+) -> CubicSpline:
+    """Builds the cubic spline inverse CDF of a CfaModel, cached like `cfa_tables`."""
+    D, _, NumCDF = cfa_tables(value_min, value_max, density, n_points, A, B)
+    return CubicSpline(NumCDF, D[:-1], extrapolate=True)
+
+
+@njit(parallel=True, cache=True)
+def sample_inverse_cdf_numba(u: np.ndarray, cdf: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Maps uniform draws through a tabulated inverse CDF with linear interpolation.
+
+    Same result as np.interp(u, cdf, values), draws outside the CDF range are clamped to the first/last value.
+    The draws are passed in rather than generated here, so results do not depend on the thread scheduling.
+    """
+    n = cdf.shape[0]
+    out = np.empty(u.shape[0])
+    for i in prange(u.shape[0]):
+        ui = u[i]
+        if ui <= cdf[0]:
+            out[i] = values[0]
+        elif ui >= cdf[n - 1]:
+            out[i] = values[n - 1]
+        else:
+            # bisection for cdf[lo] <= ui < cdf[hi]
+            lo = 0
+            hi = n - 1
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if cdf[mid] <= ui:
+                    lo = mid
+                else:
+                    hi = mid
+            t = (ui - cdf[lo]) / (cdf[hi] - cdf[lo])
+            out[i] = values[lo] + t * (values[hi] - values[lo])
+    return out
+
+
 @dataclass
 class Rock:
     x: float
@@ -278,38 +381,77 @@ class Rock:
         self.z_shift = z_shift
 
     def to_dict(self) -> dict:
-        return asdict(self)
+        return {
+            "x": self.x,
+            "y": self.y,
+            "diameter": self.diameter,
+            "height": self.height,
+            "shape_type": self.shape_type,
+            "rot_x": self.rot_x,
+            "rot_y": self.rot_y,
+            "rot_z": self.rot_z,
+            "z_shift": self.z_shift,
+        }
 
     def to_json(self) -> str:
-        return json.dumps(asdict(self))
+        return json.dumps(self.to_dict())
+
+
+# Rock attributes, in the order of the Rock fields and of the rock field CSV columns
+ROCK_FIELDS = tuple(field.name for field in fields(Rock))
+# single precision is plenty for the rock attributes, Blender stores object transforms as float32 anyway
+ROCK_FIELD_DTYPES = {name: np.int8 if name == "shape_type" else np.float32 for name in ROCK_FIELDS}
 
 
 @dataclass
 class RockField:
-    rocks: list[Rock]
+    """A field of rocks, stored as one array per rock attribute (see ROCK_FIELDS)."""
+
+    rocks_soa: dict[str, np.ndarray]
     computed_CFA: float
 
     def __init__(self) -> None:
-        pass
+        self.rocks_soa = {name: np.empty(0, dtype=ROCK_FIELD_DTYPES[name]) for name in ROCK_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.rocks_soa["x"])
+
+    def __getitem__(self, index: int) -> Rock:
+        """Creates the Rock at the given index"""
+        return Rock(*(self.rocks_soa[name][index].item() for name in ROCK_FIELDS))
 
     @property
-    def xv(self) -> list[float]:
-        """Creates a list of x values"""
-        return [rock.x for rock in self.rocks]
+    def rocks(self) -> list[Rock]:
+        """Creates a list of Rock objects"""
+        return [self[i] for i in range(len(self))]
+
+    @rocks.setter
+    def rocks(self, rocks: list[Rock]) -> None:
+        self.rocks_soa = {
+            name: np.array([getattr(rock, name) for rock in rocks], dtype=ROCK_FIELD_DTYPES[name])
+            for name in ROCK_FIELDS
+        }
+
+    @property
+    def xv(self) -> np.ndarray:
+        """The x values of the rocks"""
+        return self.rocks_soa["x"]
 
     @property
-    def yv(self) -> list[float]:
-        """Creates a list of y values"""
-        return [rock.y for rock in self.rocks]
+    def yv(self) -> np.ndarray:
+        """The y values of the rocks"""
+        return self.rocks_soa["y"]
 
     @property
-    def diameters(self) -> list[float]:
-        """Creates a list of diameters"""
-        return [rock.diameter for rock in self.rocks]
+    def diameters(self) -> np.ndarray:
+        """The diameters of the rocks"""
+        return self.rocks_soa["diameter"]
 
     def to_dict(self) -> dict:
+        # build the per-rock records straight from the arrays, without creating a Rock for each
+        columns = [self.rocks_soa[name].tolist() for name in ROCK_FIELDS]
         return {
-            "rocks": [rock.to_dict() for rock in self.rocks],
+            "rocks": [dict(zip(ROCK_FIELDS, values)) for values in zip(*columns)],
             "computed_CFA": self.computed_CFA,
         }
 
@@ -322,52 +464,16 @@ class RockField:
         return json_string
 
     def to_csv(self, filename: str) -> None:
-        import csv
-
-        with open(filename, mode="w") as file:
-            writer = csv.writer(file)
-            writer.writerow(
-                [
-                    "x",
-                    "y",
-                    "diameter",
-                    "height",
-                    "shape_type",
-                    "rot_x",
-                    "rot_y",
-                    "rot_z",
-                    "z_shift",
-                ]
-            )
-            rows = [
-                [
-                    rock.x,
-                    rock.y,
-                    rock.diameter,
-                    rock.height,
-                    rock.shape_type,
-                    rock.rot_x,
-                    rock.rot_y,
-                    rock.rot_z,
-                    rock.z_shift,
-                ]
-                for rock in self.rocks
-            ]
-            writer.writerows(rows)
+        columns = np.column_stack([self.rocks_soa[name] for name in ROCK_FIELDS])
+        # 9 significant digits round-trip float32 exactly
+        fmt = ["%d" if ROCK_FIELD_DTYPES[name] is np.int8 else "%.9g" for name in ROCK_FIELDS]
+        np.savetxt(filename, columns, fmt=fmt, delimiter=",", header=",".join(ROCK_FIELDS), comments="")
 
     def from_csv(self, filename: str) -> None:
-        import csv
-
-        rocks = []
-        with open(filename, newline="") as csvfile:
-            reader = csv.reader(csvfile)
-            for i, row in enumerate(reader):
-                if i == 0:
-                    continue
-                x, y, diameter, height, shape_type, rot_x, rot_y, rot_z, z_shift = map(float, row)
-                shape_type = int(shape_type)
-                rocks.append(Rock(x, y, diameter, height, shape_type, rot_x, rot_y, rot_z, z_shift))
-        self.rocks = rocks
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)  # a rock field without rocks has only the header
+            columns = np.loadtxt(filename, delimiter=",", skiprows=1, ndmin=2).reshape(-1, len(ROCK_FIELDS))
+        self.rocks_soa = {name: columns[:, i].astype(ROCK_FIELD_DTYPES[name]) for i, name in enumerate(ROCK_FIELDS)}
 
     def save(self, filename: str) -> None:
         """Saves the rock field to a json and csv file.
@@ -392,7 +498,7 @@ class RockField:
         self.rock_field_ax.scatter(
             self.xv,
             self.yv,
-            s=[d * size_factor for d in self.diameters],
+            s=self.diameters * size_factor,
             c="black",
             alpha=0.5,
         )
@@ -400,7 +506,7 @@ class RockField:
         self.rock_field_ax.set_ylabel("y (m)")
         self.rock_field_ax.set_aspect("equal")
         self.rock_field_ax.set_title(
-            f"Rock Field with {len(self.rocks)} rocks in {self.computed_CFA*100:.1f}% area coverage,"
+            f"Rock Field with {len(self)} rocks in {self.computed_CFA*100:.1f}% area coverage,"
             f"total CFA={self.k*100:.1f}%"
         )
         if filename is not None:
@@ -434,7 +540,7 @@ class RockField:
             seed (int): The seed for the random number generator. Default is None.
             x_init (float): The initial x position of the rocks. Default is 0.
             y_init (float): The initial y position of the rocks. Default is 0.
-            max_type_rocks (int): The maximum number of different types of rocks. Default is 15.
+            max_type_rocks (int): The maximum number of different types of rocks. Default is 15, at most 128.
 
         """
         self.size_x = size_x
@@ -445,34 +551,42 @@ class RockField:
 
         self.cfa_model = CfaModel(h_min, h_max, k)
         rock_diameters, computed_CFA = self.cfa_model.compute_values(size_x * size_y, seed=seed)
+        rock_diameters = rock_diameters.astype(ROCK_FIELD_DTYPES["diameter"])
         n_rocks = len(rock_diameters)
 
         self.computed_CFA = computed_CFA
 
-        xv = np.random.rand(n_rocks) * size_x + x_init
-        yv = np.random.rand(n_rocks) * size_y + y_init
-
-        shape_type = np.random.randint(1, max_type_rocks, n_rocks)
-        height_factor = np.random.uniform(0.1, 0.6, n_rocks)
-        rot_x = np.random.uniform(-0.2, 0.2, n_rocks)
-        rot_y = np.random.uniform(-0.2, 0.2, n_rocks)
-        rot_z = np.random.uniform(0, 2 * np.pi, n_rocks)
-        z_shift = np.random.uniform(-0.4, 0.1, n_rocks)
-
-        self.rocks = [
-            Rock(
-                xv[i],
-                yv[i],
-                rock_diameters[i],
-                rock_diameters[i] * height_factor[i],
-                shape_type=shape_type[i],
-                rot_x=rot_x[i],
-                rot_y=rot_y[i],
-                rot_z=rot_z[i],
-                z_shift=z_shift[i] * rock_diameters[i],
-            )
-            for i in range(n_rocks)
-        ]
+        # draw all the uniform attributes in one block, one contiguous row per attribute, and scale them in place
+        rng = np.random.default_rng(seed)
+        xv, yv, height, rot_x, rot_y, rot_z, z_shift = rng.random((7, n_rocks), dtype=ROCK_FIELD_DTYPES["x"])
+        shape_type = rng.integers(1, max_type_rocks, n_rocks, dtype=ROCK_FIELD_DTYPES["shape_type"])
+        xv *= size_x
+        xv += x_init
+        yv *= size_y
+        yv += y_init
+        height *= 0.5
+        height += 0.1
+        height *= rock_diameters
+        rot_x *= 0.4
+        rot_x -= 0.2
+        rot_y *= 0.4
+        rot_y -= 0.2
+        rot_z *= 2 * np.pi
+        z_shift *= 0.5
+        z_shift -= 0.4
+        z_shift *= rock_diameters
+
+        self.rocks_soa = {
+            "x": xv,
+            "y": yv,
+            "diameter": rock_diameters,
+            "height": height,
+            "shape_type": shape_type,
+            "rot_x": rot_x,
+            "rot_y": rot_y,
+            "rot_z": rot_z,
+            "z_shift": z_shift,
+        }
 
     def load_rocks_blender(
         self,
@@ -483,7 +597,7 @@ class RockField:
     ) -> None:
         rock_field = RockField()
         rock_field.from_csv(rock_field_file)
-        print(f"Loaded {len(rock_field.rocks)} rocks.")
+        print(f"Loaded {len(rock_field)} rocks.")
         if blender_file is not None:
             blender_helper.load_blender_file(blender_file)
         else:
@@ -491,7 +605,7 @@ class RockField:
             blender_helper.setup_moon_scene()
         if mesh_file is not None:
             blender_helper.load_mesh(mesh_file)
-        self.place_rocks(rock_field.rocks, rock_source=rock_source)
+        self.place_rocks(rock_field.rocks_soa, rock_source=rock_source)
 
     def get_rock_z_ray_cast(self, rock_python_obj: Rock) -> float | None:
         # return 0.0
@@ -507,6 +621,34 @@ class RockField:
             print("Ray casting did not hit the terrain.")
             return None
 
+    def get_rocks_z_bvh(self, target_mesh: bpy.types.Object, rock_arrays: dict[str, np.ndarray]) -> np.ndarray:
+        """Gets the z of the rocks by ray casting down onto the target mesh.
+
+        The BVH tree of the mesh is built once and reused for all the rocks, instead of casting each ray
+        against the whole scene. The rocks are given as one array per attribute, as in `RockField.rocks_soa`.
+
+        Returns
+        -------
+            np.ndarray: The z of each rock, NaN where the ray did not hit the mesh.
+
+        """
+        bvh = BVHTree.FromObject(target_mesh, bpy.context.evaluated_depsgraph_get())
+        # the BVH tree is in the mesh local coordinates
+        local_to_world = target_mesh.matrix_world
+        world_to_local = local_to_world.inverted()
+        direction_down = world_to_local.to_3x3() @ Vector((0, 0, -1))
+
+        z_offsets = rock_arrays["height"] * rock_arrays["z_shift"]
+        zrocks = np.full(len(z_offsets), np.nan)
+        for i, (x, y) in enumerate(zip(rock_arrays["x"].tolist(), rock_arrays["y"].tolist())):
+            location, _, _, _ = bvh.ray_cast(world_to_local @ Vector((x, y, 1000)), direction_down)
+            if location is not None:
+                zrocks[i] = (local_to_world @ location).z + z_offsets[i]
+        n_missed = int(np.count_nonzero(np.isnan(zrocks)))
+        if n_missed > 0:
+            print(f"Ray casting did not hit the terrain for {n_missed} rocks.")
+        return zrocks
+
     def create_procedural_rock(
         self,
         n_rocks: int,
@@ -551,7 +693,7 @@ class RockField:
 
     def load_objs(
         self,
-        rock_data: list[Rock],
+        rock_data: list[Rock] | dict[str, np.ndarray],
         asset_directory: str,
         material_name: str | None = None,
     ) -> dict:
@@ -572,48 +714,55 @@ class RockField:
 
         # Load all the rocks in asset_directory, each rock is of form rock{index}.obj
         pattern = re.compile(r"rock(\d+)\.(obj|ply)")
-        for file in os.listdir(asset_directory):
-            match = pattern.match(file)
-            if match:
-                filepath = os.path.join(
-                    asset_directory,
-                    file,
-                )
-                print(f"loading {filepath}")
-                if filepath.endswith(".obj"):
-                    bpy.ops.wm.obj_import(filepath=filepath)
-                elif filepath.endswith(".ply"):
-                    bpy.ops.wm.ply_import(filepath=filepath)
-
-                rock_index = int(match.group(1))
-                loaded_objs[rock_index] = bpy.context.selected_objects[-1]
-                loaded_objs[rock_index].name = f"{rock_index}"
-                bpy.ops.object.origin_set(type="ORIGIN_GEOMETRY", center="BOUNDS")
-
-                if material is not None:
-                    loaded_objs[rock_index].data.materials.append(material)
-
-                for collection in bpy.data.collections:
-                    if loaded_objs[rock_index].name in collection.objects:
-                        collection.objects.unlink(loaded_objs[rock_index])
-                reference_rocks_collection.objects.link(loaded_objs[rock_index])
+        with os.scandir(asset_directory) as entries:
+            matches = [(entry.path, match) for entry in entries if (match := pattern.match(entry.name))]
+        for filepath, match in matches:
+            print(f"loading {filepath}")
+            if filepath.endswith(".obj"):
+                bpy.ops.wm.obj_import(filepath=filepath)
+            elif filepath.endswith(".ply"):
+                bpy.ops.wm.ply_import(filepath=filepath)
+
+            rock_index = int(match.group(1))
+            loaded_objs[rock_index] = bpy.context.selected_objects[-1]
+            loaded_objs[rock_index].name = f"{rock_index}"
+            bpy.ops.object.origin_set(type="ORIGIN_GEOMETRY", center="BOUNDS")
+
+            if material is not None:
+                loaded_objs[rock_index].data.materials.append(material)
+
+            for collection in bpy.data.collections:
+                if loaded_objs[rock_index].name in collection.objects:
+                    collection.objects.unlink(loaded_objs[rock_index])
+            reference_rocks_collection.objects.link(loaded_objs[rock_index])
 
         reference_rocks_collection.hide_viewport = True
         reference_rocks_collection.hide_render = True
         return loaded_objs
 
     def get_z_rock_from_terrain(self, terrain_interpolant, target_x: np.ndarray, target_y: np.ndarray) -> np.ndarray:
-        # Get the elevation at the target location
-        return terrain_interpolant((target_y, target_x))
+        # Get the elevation at the target location, the interpolant works in double precision
+        return terrain_interpolant((np.asarray(target_y, dtype=np.float64), np.asarray(target_x, dtype=np.float64)))
 
     def place_rocks(
         self,
-        rock_data: list[Rock],
+        rock_data: list[Rock] | dict[str, np.ndarray],
         rock_source: str = "procedural",
         target_mesh: bpy.types.Object = None,
         max_unique_rocks: int = 6,
         terrain_interpolant: RegularGridInterpolator = None,
     ) -> None:
+        """Places copies of the reference rocks in the scene.
+
+        `rock_data` is either a list of Rock or one array per attribute, as in `RockField.rocks_soa`; the
+        arrays are used directly, without creating a Rock per rock.
+        """
+        if isinstance(rock_data, dict):
+            rock_arrays = rock_data
+        else:
+            rock_arrays = {name: np.array([getattr(rock, name) for rock in rock_data]) for name in ROCK_FIELDS}
+        n_rocks = len(rock_arrays["x"])
+
         # Load the default material
         default_material_source = "assets/materials/moon_shaders.blend"
         default_material_name = "Regolith7_MAT"
@@ -640,64 +789,45 @@ class RockField:
             rocks_collection = bpy.data.collections.new("Rocks")
             bpy.context.scene.collection.children.link(rocks_collection)
 
-        valid_objs = 0
-        rock_random_choices = np.random.choice(list(loaded_objs.keys()), len(rock_data), replace=True)
-        time_per_rock = []
+        rock_random_choices = np.random.choice(list(loaded_objs.keys()), n_rocks, replace=True)
         rock_obj = loaded_objs[rock_random_choices[0]]
 
         if terrain_interpolant is not None:
             print("Using terrain interpolant to get rock z.")
-            zrocks = self.get_z_rock_from_terrain(
-                terrain_interpolant,
-                np.array([rock.x for rock in rock_data]),
-                np.array([rock.y for rock in rock_data]),
-            )
+            zrocks = self.get_z_rock_from_terrain(terrain_interpolant, rock_arrays["x"], rock_arrays["y"])
+        elif target_mesh is not None:
+            print(f"Ray casting onto {target_mesh.name} to get rock z.")
+            zrocks = self.get_rocks_z_bvh(target_mesh, rock_arrays)
         else:
-            zrocks = np.zeros(len(rock_data))
-            for i, rock in enumerate(rock_data):
-                zrocks[i] = self.get_rock_z_ray_cast(rock)
-
-        valid_rocks = 0
-        rock_index = 0
-        for rock in tqdm.tqdm(rock_data):
-            # for rock in rock_data:
-            start = time.time()
-            # rock_obj = loaded_objs[rock_random_choices[valid_objs]]
-            # rock_obj = loaded_objs
-            valid_objs += 1
+            zrocks = np.full(n_rocks, np.nan)
+            for i in range(n_rocks):
+                z_rock = self.get_rock_z_ray_cast(Rock(*(rock_arrays[name][i].item() for name in ROCK_FIELDS)))
+                if z_rock is not None:
+                    zrocks[i] = z_rock
+
+        # compute all the transforms up front, only the rocks with a valid z are created
+        valid = ~np.isnan(zrocks)
+        diameters = rock_arrays["diameter"]
+        matrices = rock_transform_matrices(
+            np.column_stack((rock_arrays["x"], rock_arrays["y"], zrocks))[valid],
+            np.column_stack((rock_arrays["rot_x"], rock_arrays["rot_y"], rock_arrays["rot_z"]))[valid],
+            np.column_stack((diameters, diameters, rock_arrays["height"]))[valid],
+        ).tolist()
 
+        start = time.time()
+        for matrix in tqdm.tqdm(matrices):
             new_rock_obj = rock_obj.copy()
             bpy.context.collection.objects.link(new_rock_obj)
-
-            # add to rocks collection
-            # for collection in bpy.data.collections:
-            #     if new_rock_obj.name in collection.objects:
-            #         collection.objects.unlink(new_rock_obj)
             rocks_collection.objects.link(new_rock_obj)
 
-            # Positioning and scaling
-            new_rock_obj.location = (rock.x, rock.y, 0)
-            new_rock_obj.scale = (rock.diameter, rock.diameter, rock.height)
-            new_rock_obj.rotation_euler = (rock.rot_x, rock.rot_y, rock.rot_z)
-
-            # z_rock = get_rock_z(new_rock_obj, rock)
-            # z_rock = np.random.uniform(0, 100)
-            z_rock = zrocks[rock_index]
-            if z_rock is not None:
-                new_rock_obj.location = Vector((new_rock_obj.location[0], new_rock_obj.location[1], z_rock))
-                valid_rocks += 1
-            else:
-                bpy.data.objects.remove(new_rock_obj)
+            # Positioning, rotation and scaling in a single property write
+            new_rock_obj.matrix_basis = Matrix(matrix)
+        time_rocks = time.time() - start
 
-            rock_index += 1
-            time_per_rock.append(time.time() - start)
+        valid_rocks = len(matrices)
+        print(f"Time to copy {dth(time_rocks)},  Average time per rock: {dth(time_rocks / max(valid_rocks, 1))}")
 
-        print(
-            f"Time to copy {dth(np.sum(time_per_rock))},  "
-            f"Average time per rock: {dth(float(np.mean(time_per_rock)))}"
-        )
-
-        print(f"Placed {valid_rocks} rocks out of {valid_objs} valid objects and {len(rock_data)} total rocks.")
+        print(f"Placed {valid_rocks} rocks out of {n_rocks} total rocks.")
 
     def delete_rocks(self) -> None:
         rocks_collection = bpy.data.collections.get("Rocks")
@@ -708,6 +838,30 @@ class RockField:
             bpy.data.collections.remove(reference_rocks_collection)
 
 
+def rock_transform_matrices(locations: np.ndarray, rotations: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Composes (N, 4, 4) object matrices from locations, XYZ Euler rotations and scales, all (N, 3).
+
+    Same convention as Blender's matrix_basis for rotation mode "XYZ": T @ Rz @ Ry @ Rx @ S.
+    """
+    cx, cy, cz = np.cos(rotations).T
+    sx, sy, sz = np.sin(rotations).T
+    matrices = np.zeros((len(locations), 4, 4))
+    matrices[:, 0, 0] = cy * cz
+    matrices[:, 0, 1] = sx * sy * cz - cx * sz
+    matrices[:, 0, 2] = cx * sy * cz + sx * sz
+    matrices[:, 1, 0] = cy * sz
+    matrices[:, 1, 1] = sx * sy * sz + cx * cz
+    matrices[:, 1, 2] = cx * sy * sz - sx * cz
+    matrices[:, 2, 0] = -sy
+    matrices[:, 2, 1] = sx * cy
+    matrices[:, 2, 2] = cx * cy
+    # scaling multiplies the columns of the rotation
+    matrices[:, :3, :3] *= scales[:, np.newaxis, :]
+    matrices[:, :3, 3] = locations
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
 def sample(distribution: dict | float) -> float:
     if isinstance(distribution, (int, float)):
         return distribution
@@ -758,62 +912,91 @@ class Crater:
     def to_json(self):
         return json.dumps(asdict(self))
 
-    @classmethod
-    def crater_depth(cls, r: float) -> float:
+    @staticmethod
+    def crater_depth(r: float | np.ndarray) -> float | np.ndarray:
+        """Crater depth profile at a normalized radius, for a scalar or an array of radii."""
         # normal crater as in https://agupubs.onlinelibrary.wiley.com/doi/10.1029/2021GL095537
+        r = np.asarray(r, dtype=float)
         D = r / 2.0
         hr = 0.02513 * D ** (-0.0757)
-        if r < 1.0:
-            a = -2.85
-            b = 5.8270
-            d0 = 0.114 * D ** (-0.002)
-            C = d0 * (np.exp(a) + 1) / (np.exp(b) - 1)
-            h = C * (np.exp(b * r) - np.exp(b)) / (1 + np.exp(a + b * r)) + hr
-        else:
-            alpha = -3.1906
-            h = hr * r**alpha
-        return h
+        # inner profile for r < 1
+        a = -2.85
+        b = 5.8270
+        d0 = 0.114 * D ** (-0.002)
+        C = d0 * (np.exp(a) + 1) / (np.exp(b) - 1)
+        h_inner = C * (np.exp(b * r) - np.exp(b)) / (1 + np.exp(a + b * r)) + hr
+        # outer profile for r >= 1
+        alpha = -3.1906
+        h_outer = hr * r**alpha
+        h = np.where(r < 1.0, h_inner, h_outer)
+        return h if h.ndim > 0 else float(h)
 
     def compute_elevation_patch(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
         x = np.linspace(-2.5, 2.5, 100)
         y = np.linspace(-2.5, 2.5, 100)
-        X, Y = np.meshgrid(x, y)
 
-        self.elevation_patch = np.zeros_like(X)
-        for i, xi in enumerate(x):
-            for j, yj in enumerate(y):
-                rij = np.sqrt(xi**2 + yj**2)
-                self.elevation_patch[i, j] = self.crater_depth(rij)
+        # broadcast the 1D axes instead of materializing meshgrid arrays
+        self.elevation_patch = self.crater_depth(np.hypot(x[:, np.newaxis], y[np.newaxis, :]))
         return self.elevation_patch, x, y
 
-    def add_crater_mesh(self, verts: list) -> list:
-        for vert in verts:
-            d = np.sqrt((vert[0] - self.x) ** 2 + (vert[1] - self.y) ** 2)
-            crater_effect_multiplier = 3.5
-            if d < self.diameter * crater_effect_multiplier:
-                vert[2] += self.crater_depth(d / self.diameter) * self.diameter
-                # print(f"Crater depth: {self.crater_depth(d / self.diameter) * self.diameter * 10.0}")
-        return verts
+    def add_crater_mesh(self, verts: list | np.ndarray) -> np.ndarray:
+        verts = np.ascontiguousarray(verts, dtype=np.float64)
+        return add_craters_mesh_numba(
+            verts,
+            np.array([self.x], dtype=np.float64),
+            np.array([self.y], dtype=np.float64),
+            np.array([self.diameter], dtype=np.float64),
+            *crater_depth_table(),
+        )
+
+
+# Crater attributes stored by CraterField, in the order of the crater field CSV columns
+CRATER_FIELDS = ("x", "y", "diameter")
+
+
+def crater_field_arrays(craters: list[Crater] | dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Returns one float64 array per crater attribute, from a list of Crater or from `CraterField.craters_soa`."""
+    if isinstance(craters, dict):
+        return {name: np.asarray(craters[name], dtype=np.float64) for name in CRATER_FIELDS}
+    return {name: np.array([getattr(crater, name) for crater in craters], dtype=np.float64) for name in CRATER_FIELDS}
 
 
 class CraterField:
+    """A field of craters, stored as one array per crater attribute (see CRATER_FIELDS)."""
+
     def __init__(self) -> None:
-        pass
+        self.craters_soa = {name: np.empty(0) for name in CRATER_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.craters_soa["x"])
+
+    def __getitem__(self, index: int) -> Crater:
+        """Creates the Crater at the given index"""
+        return Crater(*(self.craters_soa[name][index].item() for name in CRATER_FIELDS))
 
     @property
-    def xv(self) -> list[float]:
-        """Creates a list of x values"""
-        return [crater.x for crater in self.craters]
+    def craters(self) -> list[Crater]:
+        """Creates a list of Crater objects"""
+        return [self[i] for i in range(len(self))]
+
+    @craters.setter
+    def craters(self, craters: list[Crater]) -> None:
+        self.craters_soa = crater_field_arrays(craters)
 
     @property
-    def yv(self) -> list[float]:
-        """Creates a list of y values"""
-        return [crater.y for crater in self.craters]
+    def xv(self) -> np.ndarray:
+        """The x values of the craters"""
+        return self.craters_soa["x"]
 
     @property
-    def diameters(self) -> list[float]:
-        """Creates a list of diameters"""
-        return [crater.diameter for crater in self.craters]
+    def yv(self) -> np.ndarray:
+        """The y values of the craters"""
+        return self.craters_soa["y"]
+
+    @property
+    def diameters(self) -> np.ndarray:
+        """The diameters of the craters"""
+        return self.craters_soa["diameter"]
 
     def generate(
         self,
@@ -853,79 +1036,58 @@ class CraterField:
         xv = np.random.rand(n_craters) * size_x + x_init
         yv = np.random.rand(n_craters) * size_y + y_init
 
-        self.craters = [
-            Crater(
-                xv[i],
-                yv[i],
-                crater_diameters[i],
-            )
-            for i in range(n_craters)
-        ]
+        self.craters_soa = {
+            "x": xv,
+            "y": yv,
+            "diameter": np.asarray(crater_diameters, dtype=np.float64),
+        }
 
     def from_csv(self, filename: str) -> None:
-        import csv
-
-        craters = []
-        with open(filename, newline="") as csvfile:
-            reader = csv.reader(csvfile)
-            for i, row in enumerate(reader):
-                if i == 0:
-                    continue
-                x, y, diameter = map(float, row)
-                craters.append(Crater(x, y, diameter))
-        self.craters = craters
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)  # a crater field without craters has only the header
+            columns = np.loadtxt(filename, delimiter=",", skiprows=1, ndmin=2).reshape(-1, len(CRATER_FIELDS))
+        self.craters_soa = {name: np.ascontiguousarray(columns[:, i]) for i, name in enumerate(CRATER_FIELDS)}
 
     def save(self, filename: str) -> None:
-        import csv
-
         # create parent directory if it does not exist
         Path(filename).parent.mkdir(parents=True, exist_ok=True)
 
-        with open(filename, mode="w") as file:
-            writer = csv.writer(file)
-            writer.writerow(
-                [
-                    "x",
-                    "y",
-                    "diameter",
-                ]
-            )
-            rows = [
-                [
-                    crater.x,
-                    crater.y,
-                    crater.diameter,
-                ]
-                for crater in self.craters
-            ]
-            writer.writerows(rows)
-
-    def place_craters_mesh(self, craters, mesh) -> None:
-        # Get a list of all vertex coordinates
-        verts = np.array([vert.co for vert in mesh.vertices])
-
-        time_per_crater = []
-        for crater in tqdm.tqdm(craters, desc="Adding craters"):
-            start = time.time()
-            verts = crater.add_crater_mesh(verts)
-            time_per_crater.append(time.time() - start)
+        columns = np.column_stack([self.craters_soa[name] for name in CRATER_FIELDS])
+        np.savetxt(filename, columns, fmt="%.17g", delimiter=",", header=",".join(CRATER_FIELDS), comments="")
+
+    def place_craters_mesh(self, craters: list[Crater] | dict[str, np.ndarray], mesh) -> None:
+        # Get all the vertex coordinates in one call, Blender stores them as float32
+        n_verts = len(mesh.vertices)
+        verts_co = np.empty(n_verts * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", verts_co)
+
+        arrays = crater_field_arrays(craters)
+        n_craters = len(arrays["x"])
+        start = time.time()
+        verts = add_craters_mesh_numba(
+            verts_co.reshape(n_verts, 3).astype(np.float64),
+            arrays["x"],
+            arrays["y"],
+            arrays["diameter"],
+            *crater_depth_table(),
+        )
+        total_time = time.time() - start
         print(
-            f"Time to add craters {dth(np.sum(time_per_crater))},  "
-            f"Average time per crater: {dth(float(np.mean(time_per_crater)))}"
+            f"Time to add craters {dth(total_time)},  "
+            f"Average time per crater: {dth(total_time / max(n_craters, 1))}"
         )
 
         start = time.time()
-        for i, vert in enumerate(mesh.vertices):
-            vert.co = verts[i]
+        mesh.vertices.foreach_set("co", verts.astype(np.float32).ravel())
         mesh.update()
         print(f"Time to update mesh {dth(time.time() - start)}")
 
-    def place_craters_dem(self, craters: list[Crater], dem: np.ndarray) -> np.ndarray:
-        x_coords = np.array([crater.x for crater in craters])
-        y_coords = np.array([crater.y for crater in craters])
-        diameters = np.array([crater.diameter for crater in craters])
+    def place_craters_dem(self, craters: list[Crater] | dict[str, np.ndarray], dem: np.ndarray) -> np.ndarray:
+        arrays = crater_field_arrays(craters)
         start = time.time()
-        dem = place_crater_dems_numba(x_coords, y_coords, diameters, dem)
+        # the kernel walks the DEM rows, keep them stride-1
+        dem = np.ascontiguousarray(dem)
+        dem = place_crater_dems_numba(arrays["x"], arrays["y"], arrays["diameter"], dem, *crater_depth_table())
         print(f"Time to add craters {dth(time.time() - start)}")
         return dem
 
@@ -937,7 +1099,7 @@ class CraterField:
     ) -> None:
         crater_field = CraterField()
         crater_field.from_csv(crater_field_file)
-        print(f"Loaded {len(crater_field.craters)} craters.")
+        print(f"Loaded {len(crater_field)} craters.")
         # check extension of mesh_file
         if mesh_file.endswith(".blend"):
             blender_helper.load_blender_file(mesh_file)
@@ -957,53 +1119,199 @@ class CraterField:
 
         bpy.ops.object.mode_set(mode="OBJECT")
         mesh = obj.data
-        self.place_craters_mesh(crater_field.craters, mesh)
-
-
-@njit(parallel=True)
+        self.place_craters_mesh(crater_field.craters_soa, mesh)
+
+
+CRATER_EFFECT_MULTIPLIER = 3.5  # how many diameters away a crater affects the mesh
+CRATER_DEPTH_TABLE_SIZE = 7 * 1024 + 1  # puts r = 1.0, where the profile changes branch, on a table node
+DEM_TILE_SIZE = 256  # side in pixels of the DEM blocks processed in parallel by place_crater_dems_numba
+
+
+@lru_cache(maxsize=1)
+def crater_depth_table() -> tuple[np.ndarray, float]:
+    """Tabulates `Crater.crater_depth` on [0, CRATER_EFFECT_MULTIPLIER] for `crater_depth_lut`.
+
+    Returns the read-only table and its radius step. The profile diverges at r = 0, so the first node holds the
+    value half a step away. Linear interpolation is within 1e-5 of the crater peak depth for r > 0.01.
+    """
+    r, r_step = np.linspace(0.0, CRATER_EFFECT_MULTIPLIER, CRATER_DEPTH_TABLE_SIZE, retstep=True)
+    r[0] = r_step / 2
+    table = Crater.crater_depth(r)
+    table.flags.writeable = False
+    return table, r_step
+
+
+@njit(cache=True)
+def interp_table(t: float, table: np.ndarray) -> float:
+    """Linearly interpolates a table at the fractional index t >= 0, clamped to the last entry."""
+    i = int(t)
+    if i >= table.shape[0] - 1:
+        return table[table.shape[0] - 1]
+    return table[i] + (t - i) * (table[i + 1] - table[i])
+
+
+@njit(cache=True)
+def crater_depth_lut(r: float, table: np.ndarray, r_step: float) -> float:
+    """Crater depth profile interpolated from `crater_depth_table`, without transcendentals."""
+    return interp_table(r / r_step, table)
+
+
+@njit(cache=True)
+def bucket_craters(
+    x_coords: np.ndarray,
+    y_coords: np.ndarray,
+    reaches: np.ndarray,
+    x_origin: float,
+    y_origin: float,
+    cell_size: float,
+    n_cells_x: int,
+    n_cells_y: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Buckets the craters by the cells of a regular grid that their reach overlaps.
+
+    Returns CSR arrays: the craters of cell (cx, cy) are indices[starts[c]:starts[c + 1]], with c = cx * n_cells_y + cy,
+    in increasing crater order. Craters are clipped to the grid, cells out of it are dropped.
+    """
+    n_craters = x_coords.shape[0]
+    counts = np.zeros(n_cells_x * n_cells_y + 1, dtype=np.int64)
+    cell_ranges = np.empty((n_craters, 4), dtype=np.int64)
+    for k in range(n_craters):
+        cell_ranges[k, 0] = max(int(np.floor((x_coords[k] - reaches[k] - x_origin) / cell_size)), 0)
+        cell_ranges[k, 1] = min(int(np.floor((x_coords[k] + reaches[k] - x_origin) / cell_size)), n_cells_x - 1)
+        cell_ranges[k, 2] = max(int(np.floor((y_coords[k] - reaches[k] - y_origin) / cell_size)), 0)
+        cell_ranges[k, 3] = min(int(np.floor((y_coords[k] + reaches[k] - y_origin) / cell_size)), n_cells_y - 1)
+        for cx in range(cell_ranges[k, 0], cell_ranges[k, 1] + 1):
+            for cy in range(cell_ranges[k, 2], cell_ranges[k, 3] + 1):
+                counts[cx * n_cells_y + cy + 1] += 1
+    starts = np.cumsum(counts)
+    fill = starts[:-1].copy()
+    indices = np.empty(starts[-1], dtype=np.int64)
+    for k in range(n_craters):
+        for cx in range(cell_ranges[k, 0], cell_ranges[k, 1] + 1):
+            for cy in range(cell_ranges[k, 2], cell_ranges[k, 3] + 1):
+                c = cx * n_cells_y + cy
+                indices[fill[c]] = k
+                fill[c] += 1
+    return starts, indices
+
+
+@njit(parallel=True, cache=True)
+def add_craters_mesh_numba(
+    verts: np.ndarray,
+    x_coords: np.ndarray,
+    y_coords: np.ndarray,
+    diameters: np.ndarray,
+    depth_table: np.ndarray,
+    r_step: float,
+) -> np.ndarray:
+    """Adds the depth profile of every crater to the z coordinate of an (N, 3) vertex array, in place.
+
+    The craters are bucketed on a grid over the vertices (`bucket_craters`), so each vertex only visits the craters
+    whose reach overlaps its cell, in crater order. The loop runs over vertices in parallel, so each vertex is written
+    by one thread only. The profile is read from `crater_depth_table`.
+    """
+    crater_effect_multiplier = CRATER_EFFECT_MULTIPLIER
+    n_verts = verts.shape[0]
+    if n_verts == 0 or x_coords.shape[0] == 0:
+        return verts
+    reaches = diameters * crater_effect_multiplier
+    x_origin = verts[:, 0].min()
+    y_origin = verts[:, 1].min()
+    extent = max(verts[:, 0].max() - x_origin, verts[:, 1].max() - y_origin)
+    # cells about the size of a typical crater, capped to 4096 cells per side
+    cell_size = max(2.0 * np.median(reaches), extent / 4096, 1e-9)
+    n_cells_x = int((verts[:, 0].max() - x_origin) / cell_size) + 1
+    n_cells_y = int((verts[:, 1].max() - y_origin) / cell_size) + 1
+    starts, indices = bucket_craters(x_coords, y_coords, reaches, x_origin, y_origin, cell_size, n_cells_x, n_cells_y)
+
+    for i in prange(n_verts):
+        vx = verts[i, 0]
+        vy = verts[i, 1]
+        z = verts[i, 2]
+        cx = min(int(np.floor((vx - x_origin) / cell_size)), n_cells_x - 1)
+        cy = min(int(np.floor((vy - y_origin) / cell_size)), n_cells_y - 1)
+        c = cx * n_cells_y + cy
+        for p in range(starts[c], starts[c + 1]):
+            k = indices[p]
+            diameter = diameters[k]
+            reach = reaches[k]
+            dx = vx - x_coords[k]
+            dy = vy - y_coords[k]
+            d2 = dx * dx + dy * dy
+            # the sqrt is only needed for the vertices inside the crater reach
+            if d2 < reach * reach:
+                z += crater_depth_lut(np.sqrt(d2) / diameter, depth_table, r_step) * diameter
+        verts[i, 2] = z
+    return verts
+
+
+@njit(parallel=True, cache=True)
 def place_crater_dems_numba(
-    x_coords: np.ndarray, y_coords: np.ndarray, diameters: np.ndarray, dem: np.ndarray
+    x_coords: np.ndarray,
+    y_coords: np.ndarray,
+    diameters: np.ndarray,
+    dem: np.ndarray,
+    depth_table: np.ndarray,
+    r_step: float,
 ) -> np.ndarray:
-    def crater_depth_numba(
-        r: float,
-        c1: float = 0.02513,
-        c2: float = -0.0757,
-        a: float = -2.85,
-        b: float = 5.8270,
-        c4: float = 0.114,
-        c5: float = -0.002,
-        alpha: float = -3.1906,
-    ) -> float:
-        # normal crater as in https://agupubs.onlinelibrary.wiley.com/doi/10.1029/2021GL095537
-        D = r / 2.0
-
-        hr = c1 * D ** (c2)
-        if r < 1.0:
-            d0 = c4 * D ** (c5)
-            C = d0 * (np.exp(a) + 1) / (np.exp(b) - 1)
-            h = C * (np.exp(b * r) - np.exp(b)) / (1 + np.exp(a + b * r)) + hr
-        else:
-            h = hr * r**alpha
-        return h
-
-    crater_effect_multiplier = 3.5  # how many radius away to affect
-    for idx in prange(len(x_coords)):
-        x = x_coords[idx]
-        y = y_coords[idx]
-        diameter = diameters[idx]
-
-        x_min = max(int(x - diameter * crater_effect_multiplier), 0)
-        x_max = min(int(x + diameter * crater_effect_multiplier), dem.shape[0])
-        y_min = max(int(y - diameter * crater_effect_multiplier), 0)
-        y_max = min(int(y + diameter * crater_effect_multiplier), dem.shape[1])
-
-        crater_patch = np.zeros((x_max - x_min, y_max - y_min))
-        for i in range(x_min, x_max):
-            for j in range(y_min, y_max):
-                d = np.sqrt((i - x) ** 2 + (j - y) ** 2)
-                if d < diameter * crater_effect_multiplier:
-                    crater_patch[i - x_min, j - y_min] = crater_depth_numba(d / diameter) * diameter
-        dem[x_min:x_max, y_min:y_max] += crater_patch
+    """Adds the depth profile of every crater to a DEM, in place, reading the profile from `crater_depth_table`."""
+    crater_effect_multiplier = CRATER_EFFECT_MULTIPLIER
+    # bounding boxes of all the craters, clipped to the DEM, computed before the parallel loop
+    n_craters = len(x_coords)
+    x_min = np.empty(n_craters, dtype=np.int64)
+    x_max = np.empty(n_craters, dtype=np.int64)
+    y_min = np.empty(n_craters, dtype=np.int64)
+    y_max = np.empty(n_craters, dtype=np.int64)
+    for idx in range(n_craters):
+        reach = diameters[idx] * crater_effect_multiplier
+        x_min[idx] = max(int(x_coords[idx] - reach), 0)
+        x_max[idx] = min(int(x_coords[idx] + reach), dem.shape[0])
+        y_min[idx] = max(int(y_coords[idx] - reach), 0)
+        y_max[idx] = min(int(y_coords[idx] + reach), dem.shape[1])
+
+    # parallel over DEM tiles, each owning a disjoint block of the DEM, so overlapping craters never write the same
+    # cell from two threads; each tile only visits the craters bucketed to it, in crater order
+    tile_size = DEM_TILE_SIZE
+    n_tiles_x = (dem.shape[0] + tile_size - 1) // tile_size
+    n_tiles_y = (dem.shape[1] + tile_size - 1) // tile_size
+    starts, indices = bucket_craters(
+        x_coords,
+        y_coords,
+        diameters * crater_effect_multiplier,
+        0.0,
+        0.0,
+        float(tile_size),
+        n_tiles_x,
+        n_tiles_y,
+    )
+    for t in prange(n_tiles_x * n_tiles_y):
+        i_start = (t // n_tiles_y) * tile_size
+        i_end = min(i_start + tile_size, dem.shape[0])
+        j_start = (t % n_tiles_y) * tile_size
+        j_end = min(j_start + tile_size, dem.shape[1])
+        for p in range(starts[t], starts[t + 1]):
+            idx = indices[p]
+            y = y_coords[idx]
+            diameter = diameters[idx]
+            # distance to table index in a single multiply
+            table_scale = 1.0 / (diameter * r_step)
+            reach = diameter * crater_effect_multiplier
+            reach2 = reach * reach
+            for i in range(max(x_min[idx], i_start), min(x_max[idx], i_end)):
+                dx = i - x_coords[idx]
+                dx2 = dx * dx  # constant along the row
+                if dx2 >= reach2:
+                    continue
+                # only visit the contiguous run of the row inside the crater circle, padded by one pixel for rounding
+                half_chord = np.sqrt(reach2 - dx2)
+                j_low = max(int(np.floor(y - half_chord)), y_min[idx], j_start)
+                j_high = min(int(np.ceil(y + half_chord)) + 1, y_max[idx], j_end)
+                for j in range(j_low, j_high):
+                    dy = j - y
+                    d2 = dx2 + dy * dy
+                    # the sqrt is only needed for the pixels inside the crater reach
+                    if d2 < reach2:
+                        dem[i, j] += interp_table(np.sqrt(d2) * table_scale, depth_table) * diameter
     return dem
 
 
@@ -1063,7 +1371,7 @@ class Terrain:
                 y_init=0,
             )
             crater_field.save(str(Path(output_case_dir) / Path("crater_field.csv")))
-            elevation_data = crater_field.place_craters_dem(crater_field.craters, elevation_data)
+            elevation_data = crater_field.place_craters_dem(crater_field.craters_soa, elevation_data)
 
         mesh_material = terrain_dict.get("mesh_material", "Regolith7_MAT")
         start_time = time.time()
@@ -1085,7 +1393,7 @@ class Terrain:
             output_rock_field = str(Path(output_case_dir) / Path("rock_field.csv"))
             rock_field.save(output_rock_field)
             rock_field.place_rocks(
-                rock_field.rocks,
+                rock_field.rocks_soa,
                 rock_source=terrain_dict["rock_field"]["rock_source"],
                 terrain_interpolant=self.terrain_interpolant,
             )
@@ -1095,7 +1403,7 @@ class Terrain:
     ) -> RegularGridInterpolator:
         x = np.linspace(xmin, xmax, elevation_data.shape[0])
         y = np.linspace(ymin, ymax, elevation_data.shape[1])
-        terrain_interpolant = RegularGridInterpolator(
-            (x, y), np.flipud(elevation_data), bounds_error=False, fill_value=None
-        )
+        # one contiguous float64 copy up front: DEMs are usually float32, which scipy's fast linear path does not take
+        values = np.ascontiguousarray(np.flipud(elevation_data), dtype=np.float64)
+        terrain_interpolant = RegularGridInterpolator((x, y), values, bounds_error=False, fill_value=None)
         return terrain_interpolant
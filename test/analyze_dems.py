@@ -51,7 +51,12 @@ def analyze_dems() -> None:
     tif_files = [os.path.join(data_dir, f) for f in os.listdir(data_dir) if f.endswith("_surf.tif")]
     print(f"Found {len(tif_files)} DEMs files in {data_dir}")
     moon_dem_dict = {}
-    for tif_file in tif_files:
+    # latitudes and longitudes
+    lunar_south_crs = "ESRI:103878"  # Moon 2000 South Pole Stereographic
+    lunar_center_crs = "ESRI:104903"  # GCS_Moon_2000
+    centers_x = np.zeros(len(tif_files))
+    centers_y = np.zeros(len(tif_files))
+    for i, tif_file in enumerate(tif_files):
         moon_dem_dict[tif_file] = {}
         moon_dem_dict[tif_file]["Site"] = os.path.basename(tif_file).split("_")[0]
         moon_dem_dict[tif_file]["Filename"] = os.path.basename(tif_file)
@@ -71,40 +76,42 @@ def analyze_dems() -> None:
             #     src.transform, src.height // 2, src.width // 2
             # )
 
-            # latitudes and longitudes
-            lunar_south_crs = "ESRI:103878"  # Moon 2000 South Pole Stereographic
-            lunar_center_crs = "ESRI:104903"  # GCS_Moon_2000
             center_y = (src.bounds.left + src.bounds.right) / 2
             center_x = (src.bounds.top + src.bounds.bottom) / 2
-            long, lat = transform(lunar_south_crs, lunar_center_crs, [center_y], [center_x])
-            center_latitude, center_longitude = (
-                math.radians(lat[0]),
-                math.radians(long[0]),
-            )
-            # center_longitude = (-center_longitude+math.pi/2) % (2 * np.pi)
-            center_latitude_str, center_longitude_str = latlong_rad_to_strings(
-                center_latitude, center_longitude % (2 * np.pi)
-            )
             moon_dem_dict[tif_file]["CenterX"] = center_x / 1000
             moon_dem_dict[tif_file]["CenterY"] = center_y / 1000
-            moon_dem_dict[tif_file]["Latitude"] = center_latitude_str
-            moon_dem_dict[tif_file]["Longitude"] = center_longitude_str
             moon_dem_dict[tif_file]["bounds"] = src.bounds
-            # print(f"Latitude: {center_latitude}")
-            # print(f"long {center_longitude}, dxdy angle {dxydy}, diff {center_longitude-dxydy}")
-            moon_R = 1737.4 * 1000
-            dxdy_norm = np.sqrt(center_x**2 + center_y**2)
-            dxdy_angle = np.arcsin(dxdy_norm / moon_R)
-            dxdy_sin = dxdy_norm / moon_R
-            dxdy_tan = np.tan(dxdy_angle)
-            # print(f"long to 0 {center_latitude}, dxdy long {dxdy_angle}, diff {center_longitude - dxydy}")
-            # print(f"lat to 90 {np.pi - center_latitude}, dxdy lat {dxdy_angle},
-            # diff {np.pi - center_latitude - dxdy_angle}")
-            print(
-                f"lat to 90 {np.pi/2 - abs(center_latitude)- dxdy_angle}, "
-                f"diff {np.pi/2 - abs(center_latitude) - dxdy_sin}, "
-                f"diff {np.pi/2 - abs(center_latitude) - dxdy_tan}"
-            )
+            centers_x[i] = center_x
+            centers_y[i] = center_y
+
+    # transform all the DEM centers at once, the CRS setup is paid once instead of once per DEM
+    longs, lats = transform(lunar_south_crs, lunar_center_crs, centers_y.tolist(), centers_x.tolist())
+    for tif_file, center_x, center_y, long, lat in zip(tif_files, centers_x, centers_y, longs, lats):
+        center_latitude, center_longitude = (
+            math.radians(lat),
+            math.radians(long),
+        )
+        # center_longitude = (-center_longitude+math.pi/2) % (2 * np.pi)
+        center_latitude_str, center_longitude_str = latlong_rad_to_strings(
+            center_latitude, center_longitude % (2 * np.pi)
+        )
+        moon_dem_dict[tif_file]["Latitude"] = center_latitude_str
+        moon_dem_dict[tif_file]["Longitude"] = center_longitude_str
+        # print(f"Latitude: {center_latitude}")
+        # print(f"long {center_longitude}, dxdy angle {dxydy}, diff {center_longitude-dxydy}")
+        moon_R = 1737.4 * 1000
+        dxdy_norm = np.sqrt(center_x**2 + center_y**2)
+        dxdy_angle = np.arcsin(dxdy_norm / moon_R)
+        dxdy_sin = dxdy_norm / moon_R
+        dxdy_tan = np.tan(dxdy_angle)
+        # print(f"long to 0 {center_latitude}, dxdy long {dxdy_angle}, diff {center_longitude - dxydy}")
+        # print(f"lat to 90 {np.pi - center_latitude}, dxdy lat {dxdy_angle},
+        # diff {np.pi - center_latitude - dxdy_angle}")
+        print(
+            f"lat to 90 {np.pi/2 - abs(center_latitude)- dxdy_angle}, "
+            f"diff {np.pi/2 - abs(center_latitude) - dxdy_sin}, "
+            f"diff {np.pi/2 - abs(center_latitude) - dxdy_tan}"
+        )
 
     # total size of all DEMs
     total_size = sum([moon_dem_dict[tif_file]["Size (km^2)"] for tif_file in tif_files])
@@ -113,16 +120,18 @@ def analyze_dems() -> None:
     # get coordinates of 84, 85, 86, 87, 88, 89, degrees circles
 
     circles_degrees = [84, 87, 89]
-    cx = np.zeros(len(circles_degrees))
-    for i, lat_deg in enumerate(circles_degrees):
-        # lat = math.radians(lat_deg)
-        latlong = transform(lunar_center_crs, lunar_south_crs, [0], [-lat_deg])
-        print(f"Circle at {lat_deg} degrees latitude, x: {latlong[0][0]:.2f}, y: {latlong[1][0]:.2f}")
-        cx[i] = latlong[1][0]
-
     critical_latitude = 90 - 1.54
-    latlong_critical = transform(lunar_center_crs, lunar_south_crs, [0], [-critical_latitude])
-    cx_critical = latlong_critical[1][0]
+    # the circles and the critical latitude in a single transform call
+    circles_x, circles_y = transform(
+        lunar_center_crs,
+        lunar_south_crs,
+        [0] * (len(circles_degrees) + 1),
+        [-lat_deg for lat_deg in circles_degrees] + [-critical_latitude],
+    )
+    cx = np.array(circles_y[: len(circles_degrees)])
+    for lat_deg, circle_x, circle_y in zip(circles_degrees, circles_x, circles_y):
+        print(f"Circle at {lat_deg} degrees latitude, x: {circle_x:.2f}, y: {circle_y:.2f}")
+    cx_critical = circles_y[-1]
 
     # print dict as table
     import pandas as pd
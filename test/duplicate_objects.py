@@ -18,6 +18,7 @@ import time
 
 import bpy
 import matplotlib.pyplot as plt
+from mathutils import Euler, Matrix, Vector
 
 # clear the scene
 bpy.ops.object.select_all(action="DESELECT")
@@ -29,28 +30,17 @@ bpy.ops.wm.ply_import(filepath=obj_filepath)
 rock_obj = bpy.context.selected_objects[-1]
 
 # load obj for rock type 16
+# copies share the mesh data of rock_obj, like duplicate(linked=True), without the operator and undo overhead
 time_copy = []
 for i in range(2000):
     start = time.time()
-    bpy.ops.object.duplicate(linked=True)
-    # move to random location
-    bpy.context.object.location = (
-        random.uniform(-10, 10),
-        random.uniform(-10, 10),
-        random.uniform(-10, 10),
-    )
-    # scale randomly
-    bpy.context.object.scale = (
-        random.uniform(0.1, 1),
-        random.uniform(0.1, 1),
-        random.uniform(0.1, 1),
-    )
-
-    # random rotation
-    bpy.context.object.rotation_euler = (
-        random.uniform(0, 3.14),
-        random.uniform(0, 3.14),
-        random.uniform(0, 3.14),
+    new_obj = rock_obj.copy()
+    bpy.context.collection.objects.link(new_obj)
+    # random location, rotation and scale in a single transform write
+    new_obj.matrix_basis = Matrix.LocRotScale(
+        Vector((random.uniform(-10, 10), random.uniform(-10, 10), random.uniform(-10, 10))),
+        Euler((random.uniform(0, 3.14), random.uniform(0, 3.14), random.uniform(0, 3.14))),
+        Vector((random.uniform(0.1, 1), random.uniform(0.1, 1), random.uniform(0.1, 1))),
     )
     end = time.time()
     time_copy.append(end - start)
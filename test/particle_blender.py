@@ -14,7 +14,6 @@
 # create a blender file with 20 random cubes
 
 import datetime as dt
-import random
 import time
 
 import bpy
@@ -81,36 +80,42 @@ psys = particle_systems[0]
 time_copy = []
 print(f" {len(psys.particles)} particles")
 
-bpy.context.view_layer.update()
 start = time.time()
 # bpy.ops.particle.particle_edit_toggle()
-size_list = [random.uniform(0.1, 3.0) for i in range(len(psys.particles))]
-psys.particles.foreach_set("size", size_list)
+rng = np.random.default_rng()
+# per-particle sizes owned by the script, all updates write into this buffer
+sizes = np.empty(len(psys.particles), dtype=np.float32)
+
+
+def fill_uniform(buffer, low, high):
+    # uniform samples in [low, high) written in place
+    rng.random(out=buffer, dtype=np.float32)
+    buffer *= high - low
+    buffer += low
+
+
+fill_uniform(sizes, 0.1, 3.0)
+psys.particles.foreach_set("size", sizes)
 psys.settings.display_size = 1.0
+# single depsgraph update after all the particle changes, needed before reading the sizes back
 bpy.context.view_layer.update()
-# psys.particles.foreach_set("size", size_list)
 
-recovered_size_list = np.empty(len(psys.particles))
+recovered_size_list = np.empty(len(psys.particles), dtype=np.float32)
 psys.particles.foreach_get("size", recovered_size_list)
 
-print(f"Size list: {size_list}, Recovered size list: {recovered_size_list}")
+print(f"Sizes: {sizes}, Recovered size list: {recovered_size_list}")
 time_copy = time.time() - start
 print(
     f"Total time to copy {n_objects} objects: {dth(time_copy)}, "
     f"average time to copy an object: {dth(time_copy/n_objects)}"
 )
-bpy.context.view_layer.update()
 
 
 def particleSetter(scene, degp):
-    emitter = bpy.data.objects["Emitter"]
-    degp = bpy.context.evaluated_depsgraph_get()
-    particle_systems = emitter.evaluated_get(degp).particle_systems
-    psys = particle_systems[0]
-
-    size_list = [random.uniform(0.3, 3.0) for i in range(len(psys.particles))]
+    # refill the persistent size buffer without allocating a new array
+    fill_uniform(sizes, 0.3, 3.0)
 
-    psys.particles.foreach_set("size", size_list)
+    psys.particles.foreach_set("size", sizes)
 
 
 # bpy.app.handlers.frame_change_post.clear()
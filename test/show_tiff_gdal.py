@@ -16,19 +16,25 @@ import os
 import humanize
 import matplotlib.pyplot as plt
 import numpy as np
-from osgeo import gdal
+import rasterio
+from rasterio.enums import Resampling
 
 # Open the TIFF file
 tiff_file = "../moon_data/pgda/LM7_final_adj_5mpp_surf.tif"
-dataset = gdal.Open(tiff_file)
+# reduction factor of the displayed image, decoded from the overviews when the file has them
+display_factor = 8
 
-# Read the raster bands as arrays
-band = dataset.GetRasterBand(1)
-array = band.ReadAsArray()
+with rasterio.open(tiff_file) as dataset:
+    # Get image size (dimensions)
+    width = dataset.width
+    height = dataset.height
 
-# Get image size (dimensions)
-width = dataset.RasterXSize
-height = dataset.RasterYSize
+    # Read the raster band at display resolution
+    array = dataset.read(
+        1,
+        out_shape=(max(1, height // display_factor), max(1, width // display_factor)),
+        resampling=Resampling.average,
+    )
 
 print(f"Image dimensions: {width} x {height}")
 
@@ -46,10 +52,15 @@ plt.show()
 
 fig = plt.figure()
 ax = fig.add_subplot(111, projection="3d")
-x = np.linspace(0, width, width)
-y = np.linspace(0, height, height)
+# subsample so the surface has at most 512 points per side
+stride = max(1, int(np.ceil(max(array.shape) / 512)))
+sub = array[::stride, ::stride]
+h2, w2 = sub.shape
+# pixel coordinates in the full resolution raster
+x = np.arange(w2, dtype=np.float32) * (stride * width / array.shape[1])
+y = np.arange(h2, dtype=np.float32) * (stride * height / array.shape[0])
 X, Y = np.meshgrid(x, y)
-ax.plot_surface(X, Y, array, cmap="gray")
+ax.plot_surface(X, Y, sub, cmap="gray", rstride=1, cstride=1)
 # equal aspect ratio
 # ax.set_box_aspect([1, 1, 1])
 plt.title("TIFF Image 3D")
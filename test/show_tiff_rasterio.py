@@ -12,6 +12,7 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 import rasterio
+from lunasynth.dem_tools import load_dem
 from rasterio.plot import show
 
 # Path to the GeoTIFF file
@@ -23,8 +24,8 @@ with rasterio.open(file_path) as dataset:
     print("Metadata:")
     print(dataset.meta)
 
-    # Read the first band
-    band1 = dataset.read(1)
+    # Read the first band, from the decoded cache next to the file after the first run
+    band1 = load_dem(file_path)
 
     # Show the image
     show(band1, title="Band 1")
@@ -13,38 +13,77 @@
 #  limitations under the License.
 import argparse
 
-import bmesh
 import bpy
 import numpy as np
-from PIL import Image
+from lunasynth.dem_tools import load_dem
+from numba import njit, prange
+
+
+@njit(parallel=True, cache=True)
+def build_quads(width, height, out):
+    # Write the four vertex indices of each grid cell quad, one grid row per thread
+    for y in prange(height - 1):
+        base = y * (width - 1)
+        row0 = y * width
+        row1 = (y + 1) * width
+        for x in range(width - 1):
+            k = (base + x) * 4
+            out[k] = row0 + x
+            out[k + 1] = row0 + x + 1
+            out[k + 2] = row1 + x + 1
+            out[k + 3] = row1 + x
+
+
+def part1by1(v):
+    # Spread the lower 16 bits of v so that there is a zero bit between each of them
+    v = v.astype(np.uint32) & 0x0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+
+def morton_code(x, y):
+    # Z-order index of the grid coordinates (x, y)
+    return part1by1(x) | (part1by1(y) << 1)
 
 
 # Function to create a mesh from height map
 def create_mesh_from_height_map(height_map, width, height):
     # Create a new mesh
     mesh = bpy.data.meshes.new("height_map_mesh")
-    # create new mesh with heigh and width
-    bm = bmesh.new()
-
-    # Create vertices
-    for y in range(height):
-        for x in range(width):
-            z = height_map[y, x] / 255.0  # Scale the height value
-            bm.verts.new((x, y, z))
-
-    bm.verts.ensure_lookup_table()
 
-    # Create faces
-    for y in range(height - 1):
-        for x in range(width - 1):
-            v1 = bm.verts[y * width + x]
-            v2 = bm.verts[y * width + (x + 1)]
-            v3 = bm.verts[(y + 1) * width + (x + 1)]
-            v4 = bm.verts[(y + 1) * width + x]
-            bm.faces.new((v1, v2, v3, v4))
-
-    bm.to_mesh(mesh)
-    bm.free()
+    # Create vertices on the (x, y) grid, row-major like the height map
+    xs, ys = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+    zs = height_map.astype(np.float32, copy=False)
+    verts = np.stack((xs, ys, zs), axis=-1).reshape(-1)
+
+    # Create quad faces from the lower-left vertex index of each grid cell
+    faces = np.empty((height - 1) * (width - 1) * 4, dtype=np.int32)
+    build_quads(width, height, faces)
+    faces = faces.reshape(-1, 4)
+
+    # Store vertices and faces in Z-order so grid neighbours stay close in memory
+    row, col = np.divmod(np.arange(width * height), width)
+    vert_order = np.argsort(morton_code(col, row), kind="stable")
+    new_index = np.empty_like(vert_order, dtype=np.int32)
+    new_index[vert_order] = np.arange(width * height, dtype=np.int32)
+    verts = verts.reshape(-1, 3)[vert_order].ravel()
+    row, col = np.divmod(faces[:, 0], width)
+    faces = new_index[faces[np.argsort(morton_code(col, row), kind="stable")]]
+    num_faces = len(faces)
+
+    mesh.vertices.add(width * height)
+    mesh.vertices.foreach_set("co", verts)
+    mesh.loops.add(4 * num_faces)
+    mesh.loops.foreach_set("vertex_index", faces.ravel())
+    mesh.polygons.add(num_faces)
+    mesh.polygons.foreach_set("loop_start", np.arange(0, 4 * num_faces, 4, dtype=np.int32))
+    mesh.polygons.foreach_set("loop_total", np.full(num_faces, 4, dtype=np.int32))
+    # quads are wound counter-clockwise seen from +z, so the face normals are consistent and point up
+    mesh.update(calc_edges=True)
+    mesh.validate()
 
     # Create a new object with the mesh
     obj = bpy.data.objects.new("HeightMapObject", mesh)
@@ -60,10 +99,9 @@ parser.add_argument("image_path", type=str, help="Path to the TIFF image file")
 # Parse arguments
 args = parser.parse_args()
 
-# Load the image using PIL
+# Load the elevation band, from the decoded cache next to the file after the first run
 image_path = args.image_path
-image = Image.open(image_path)
-height_map = np.array(image.convert("L"))  # Convert to grayscale
+height_map = load_dem(image_path)
 
 # Get the image dimensions
 height, width = height_map.shape
@@ -71,13 +109,8 @@ height, width = height_map.shape
 # Create the mesh from the height map
 create_mesh_from_height_map(height_map, width, height)
 
-# Set up the viewport to see the result
-bpy.ops.object.mode_set(mode="EDIT")
-bpy.ops.mesh.normals_make_consistent(inside=False)
-bpy.ops.object.mode_set(mode="OBJECT")
-
 # Optionally, scale the mesh to fit the scene better
-bpy.context.object.scale = (0.1, 0.1, 10)
+bpy.context.object.scale = (0.1, 0.1, 0.1)
 
 #  save the file
 bpy.ops.wm.save_as_mainfile(filepath="height_map.blend")
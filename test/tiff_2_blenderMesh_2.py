@@ -12,6 +12,7 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 import bpy
+import numpy as np
 
 # Parameters
 N = 300  # Number of vertices along width
@@ -23,9 +24,29 @@ file_path = "../moon_data/pgda78/Haworth_final_adj_5mpp_surf.tif"
 # activate addon add_mesh_extra_objects
 
 
-# Create the plane
-bpy.ops.mesh.primitive_grid_add(x_subdivisions=N, y_subdivisions=M, size=1)
-plane = bpy.context.object
+# Create the plane as a unit grid with (N + 1) x (M + 1) vertices, without going through the operators
+xs, ys = np.meshgrid(np.linspace(-0.5, 0.5, N + 1, dtype=np.float32), np.linspace(-0.5, 0.5, M + 1, dtype=np.float32))
+verts = np.stack((xs.ravel(), ys.ravel(), np.zeros(xs.size, dtype=np.float32)), axis=-1)
+v1 = (np.arange(M, dtype=np.int32)[:, np.newaxis] * (N + 1) + np.arange(N, dtype=np.int32)).ravel()
+faces = np.stack((v1, v1 + 1, v1 + N + 2, v1 + N + 1), axis=-1)
+num_faces = len(faces)
+
+mesh = bpy.data.meshes.new("grid")
+mesh.vertices.add(len(verts))
+mesh.vertices.foreach_set("co", verts.ravel())
+mesh.loops.add(4 * num_faces)
+mesh.loops.foreach_set("vertex_index", faces.ravel())
+mesh.polygons.add(num_faces)
+mesh.polygons.foreach_set("loop_start", np.arange(0, 4 * num_faces, 4, dtype=np.int32))
+mesh.polygons.foreach_set("loop_total", np.full(num_faces, 4, dtype=np.int32))
+# smooth shading set directly on the faces
+mesh.polygons.foreach_set("use_smooth", np.ones(num_faces, dtype=bool))
+mesh.update(calc_edges=True)
+
+plane = bpy.data.objects.new("Grid", mesh)
+bpy.context.collection.objects.link(plane)
+bpy.context.view_layer.objects.active = plane
+plane.select_set(True)
 plane.scale = (width / 2.0, length / 2.0, 1.0)
 
 # Create a new texture
@@ -42,8 +63,5 @@ displace_modifier.texture = texture
 # Set the displacement strength
 displace_modifier.strength = 1.0  # Adjust the strength as needed
 
-
-# Optionally, smooth the shading
-bpy.ops.object.shade_smooth()
 # save the file
 bpy.ops.wm.save_as_mainfile(filepath="tiff_2_blenderMesh.blend")
@@ -12,45 +12,61 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 
 import bpy
-import bpy.bmesh as bm
 import numpy as np
 import rasterio
 
+# Number of grid rows built per task in create_mesh_from_height_map
+TILE_ROWS = 256
+
+
+def fill_mesh_tile(height_map, verts, faces, y0, y1):
+    # Write the vertices of rows [y0, y1) and the quads whose lower-left corner is in those rows
+    height, width = height_map.shape
+    xs = np.arange(width, dtype=np.float32)
+    tile_verts = verts[y0 * width : y1 * width].reshape(y1 - y0, width, 3)
+    tile_verts[:, :, 0] = xs
+    tile_verts[:, :, 1] = np.arange(y0, y1, dtype=np.float32)[:, np.newaxis]
+    tile_verts[:, :, 2] = height_map[y0:y1]
+
+    y1_faces = min(y1, height - 1)
+    if y1_faces <= y0:
+        return
+    v1 = np.arange(y0, y1_faces, dtype=np.int32)[:, np.newaxis] * width + np.arange(width - 1, dtype=np.int32)
+    tile_faces = faces[y0 * (width - 1) : y1_faces * (width - 1)].reshape(y1_faces - y0, width - 1, 4)
+    tile_faces[:, :, 0] = v1
+    tile_faces[:, :, 1] = v1 + 1
+    tile_faces[:, :, 2] = v1 + width + 1
+    tile_faces[:, :, 3] = v1 + width
+
 
 # Function to create a mesh from height map
 def create_mesh_from_height_map(height_map, width, height):
-    # Create a new mesh
-    # mesh = bpy.data.meshes.new("height_map_mesh")
-    # create new mesh with heigh and width
-    # bm = bmesh.new()
-
-    # Create vertices
-    print("Create vertices")
-    verts = np.zeros((width * height), dtype=object)
-    k = 0
-    for y in range(height):
-        for x in range(width):
-            k += 1
-            verts[k] = height_map[y, x]
-
-    # bm.verts.ensure_lookup_table()
-
-    # Create faces
-    print("Create faces")
-    faces = np.empty((width - 1) * (height - 1), dtype=object)
-    for y in range(height - 1):
-        for x in range(width - 1):
-            v1 = verts[y * width + x]
-            v2 = verts[y * width + (x + 1)]
-            v3 = verts[(y + 1) * width + (x + 1)]
-            v4 = verts[(y + 1) * width + x]
-            bm.faces.new((v1, v2, v3, v4))
+    # Create vertices and faces, kept in float32 like Blender's vertex coordinates, in row tiles
+    # written in place by a thread pool so no full size temporaries are allocated
+    print("Create vertices and faces")
+    verts = np.empty((height * width, 3), dtype=np.float32)
+    faces = np.empty(((height - 1) * (width - 1), 4), dtype=np.int32)
+    num_faces = len(faces)
+    with ThreadPoolExecutor() as executor:
+        tiles = [
+            executor.submit(fill_mesh_tile, height_map, verts, faces, y0, min(y0 + TILE_ROWS, height))
+            for y0 in range(0, height, TILE_ROWS)
+        ]
+        for tile in tiles:
+            tile.result()
 
     mesh = bpy.data.meshes.new("DEM")
-    mesh.from_pydata(verts, [], faces)
-    mesh.update()
+    mesh.vertices.add(len(verts))
+    mesh.vertices.foreach_set("co", verts.ravel())
+    mesh.loops.add(4 * num_faces)
+    mesh.loops.foreach_set("vertex_index", faces.ravel())
+    mesh.polygons.add(num_faces)
+    mesh.polygons.foreach_set("loop_start", np.arange(0, 4 * num_faces, 4, dtype=np.int32))
+    mesh.polygons.foreach_set("loop_total", np.full(num_faces, 4, dtype=np.int32))
+    mesh.update(calc_edges=True)
 
     # Create a new object with the mesh
     obj = bpy.data.objects.new("HeightMapObject", mesh)
@@ -59,32 +75,21 @@ def create_mesh_from_height_map(height_map, width, height):
     obj.select_set(True)
 
 
-def create_mesh_primitive(elevation_data, mesh_size):
-    # Step 2: Create a plane in Blender
-    print("Create plane")
-    height, width = elevation_data.shape
-    bpy.ops.mesh.primitive_grid_add(x_subdivisions=width - 1, y_subdivisions=height - 1, size=mesh_size)
-
-    # Reshape the elevation data to match the vertex coordinates
-    print("Flatten array")
-    elevation_data_reshaped = elevation_data.flatten()
-
-    # Apply the changes back to the mesh vertices
-    for i, vertex in enumerate(bpy.context.active_object.data.vertices):
-        vertex.co.z = elevation_data_reshaped[i]
-
-
 def create_mesh_bmesh(elevation_data, mesh_size, dx, dy):
     # Step 2: Create a plane in Blender
     print("Create plane")
     height, width = elevation_data.shape
 
-    # Reshape the elevation data to match the vertex coordinates
-    elevation_data_reshaped = elevation_data.flatten()
-    verts = [(i * dx, (i // width) * dx, z) for i, z in enumerate(elevation_data_reshaped)]
+    # Build the vertex coordinates on the raster grid, row-major like the elevation data
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+    verts = np.empty((height * width, 3), dtype=np.float32)
+    verts[:, 0] = xs.ravel() * dx
+    verts[:, 1] = ys.ravel() * dy
+    verts[:, 2] = elevation_data.astype(np.float32, copy=False).ravel()
 
     mesh = bpy.data.meshes.new("DEM")
-    mesh.from_pydata(verts, [], [])
+    mesh.vertices.add(len(verts))
+    mesh.vertices.foreach_set("co", verts.ravel())
     mesh.update()
 
     bpy.ops.object.select_all(action="DESELECT")
@@ -96,9 +101,38 @@ def create_mesh_bmesh(elevation_data, mesh_size, dx, dy):
     obj.select_set(True)
 
 
+def create_mesh_displace(image_path, width, height, mesh_size, dtype, subdivision_levels=0):
+    # Step 2: Create a grid with one vertex per pixel and let Blender's displace modifier
+    # apply the elevation from the TIFF, so no per-vertex work happens in Python
+    print("Create displaced grid")
+    bpy.ops.mesh.primitive_grid_add(x_subdivisions=width - 1, y_subdivisions=height - 1, size=mesh_size, calc_uvs=True)
+    obj = bpy.context.active_object
+
+    texture = bpy.data.textures.new(name="DEMTexture", type="IMAGE")
+    texture.image = bpy.data.images.load(image_path)
+    texture.image.colorspace_settings.is_data = True
+    texture.extension = "EXTEND"
+
+    displace_modifier = obj.modifiers.new(name="Displace", type="DISPLACE")
+    displace_modifier.texture = texture
+    displace_modifier.texture_coords = "UV"
+    displace_modifier.mid_level = 0.0
+    # float images are sampled in their own units, integer images are normalized by the type maximum
+    displace_modifier.strength = 1.0 if np.issubdtype(dtype, np.floating) else float(np.iinfo(dtype).max)
+
+    if subdivision_levels > 0:
+        subsurf_modifier = obj.modifiers.new(name="Subdivision", type="SUBSURF")
+        subsurf_modifier.levels = subdivision_levels
+        subsurf_modifier.render_levels = subdivision_levels
+
+
 # Argument parser setup
 parser = argparse.ArgumentParser(description="Import TIFF image and create height map mesh in Blender.")
 parser.add_argument("image_path", type=str, help="Path to the TIFF image file")
+parser.add_argument(
+    "--python-mesh", action="store_true", help="Build the vertices in Python instead of with a displace modifier"
+)
+parser.add_argument("--subdivision-levels", type=int, default=0, help="Subdivision levels on the displaced grid")
 
 # Parse arguments
 args = parser.parse_args()
@@ -107,15 +141,24 @@ print(f"loading {args.image_path}")
 # Step 1: Load the GeoTIFF data
 
 with rasterio.open(args.image_path) as dataset:
-    elevation_data = dataset.read(1)  # Read the first band
+    height, width = dataset.shape
+    dtype = np.dtype(dataset.dtypes[0])
     mesh_size = dataset.shape[0] * dataset.res[0]
     dx = dataset.res[0]
     dy = dataset.res[1]
+    if args.python_mesh:
+        # Read the first band block by block straight into the float32 buffer used for the mesh
+        elevation_data = np.empty(dataset.shape, dtype=np.float32)
+        for _, window in dataset.block_windows(1):
+            elevation_data[window.toslices()] = dataset.read(1, window=window, out_dtype=np.float32)
 print("..loaded")
 
 
-# create_mesh_from_height_map(elevation_data, dataset.shape[1], dataset.shape[0])
-create_mesh_bmesh(elevation_data, mesh_size, dx, dy)
+if args.python_mesh:
+    # create_mesh_from_height_map(elevation_data, width, height)
+    create_mesh_bmesh(elevation_data, mesh_size, dx, dy)
+else:
+    create_mesh_displace(args.image_path, width, height, mesh_size, dtype, args.subdivision_levels)
 
 
 bpy.ops.preferences.addon_enable(module="add_mesh_extra_objects")
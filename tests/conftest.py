@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+#  Copyright (c) 2024. Jet Propulsion Laboratory. All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+import os
+from pathlib import Path
+
+import pytest
+from lunasynth.cli.combine_images import main as combine_images_main
+
+
+@pytest.fixture(scope="session", autouse=True)
+def prewarm_bpy():
+    """Initializes Blender once per session from factory settings, before the other session fixtures configure it"""
+    try:
+        import bpy
+    except ImportError:
+        # only the tests that do not need Blender can run
+        yield
+        return
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    yield
+
+
+@pytest.fixture(scope="session")
+def combined_images_dir(tmp_path_factory):
+    """Combines the rock and pebble test frames once per session, tests must only read the output"""
+    output_path = tmp_path_factory.mktemp("combined") / Path("combined_basic")
+    test_args = [
+        "combine_images.py",
+        "tests/resources/combine_images",
+        "--prefixes",
+        "rock",
+        "pebble",
+        "--output-prefix",
+        "rocks",
+        "--output-dir",
+        str(output_path),
+    ]
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr("sys.argv", test_args)
+        combine_images_main()
+    return output_path
+
+
+@pytest.fixture(scope="session", autouse=True)
+def enable_cycles_gpu():
+    """Renders the Blender tests on the GPU when LUNASYNTH_TEST_GPU=1 and the host has one"""
+    if os.environ.get("LUNASYNTH_TEST_GPU") != "1":
+        yield None
+        return
+    import bpy
+    import lunasynth.blender_helper as bh
+
+    device_type = bh.enable_gpu_rendering()
+    if device_type is None:
+        yield None
+        return
+
+    # the device is stored per scene, so it is set again on every blend file the tests load
+    @bpy.app.handlers.persistent
+    def use_gpu(*_args):
+        for scene in bpy.data.scenes:
+            scene.cycles.device = "GPU"
+
+    bpy.app.handlers.load_post.append(use_gpu)
+    yield device_type
+    bpy.app.handlers.load_post.remove(use_gpu)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fast_test_renders():
+    """Renders with 1 sample at 10% resolution when LUNASYNTH_FAST_TESTS=1, as the render tests only check outputs"""
+    if os.environ.get("LUNASYNTH_FAST_TESTS") != "1":
+        yield
+        return
+    import bpy
+
+    # applied right before every render, so it also covers blend files and render configs loaded by the tests
+    @bpy.app.handlers.persistent
+    def reduce_render_cost(scene, *_args):
+        scene.cycles.samples = 1
+        scene.cycles.use_adaptive_sampling = True
+        scene.cycles.adaptive_threshold = 0.5
+        scene.cycles.use_denoising = False
+        scene.render.resolution_percentage = 10
+
+    bpy.app.handlers.render_pre.append(reduce_render_cost)
+    yield
+    bpy.app.handlers.render_pre.remove(reduce_render_cost)
@@ -14,29 +14,18 @@
 #  limitations under the License.
 
 
+import os
+import shutil
 from pathlib import Path
 
+import cv2
+import lunasynth.image_tools as image_tools
+import numpy as np
 from lunasynth.cli.combine_images import main
 
 
-def test_combine_images(caplog, monkeypatch, tmp_path):
-    # render it
-    output_path = tmp_path / Path("combined_basic")
-    test_args = [
-        "combine_images.py",
-        "tests/resources/combine_images",
-        "--prefixes",
-        "rock",
-        "pebble",
-        "--output-prefix",
-        "rocks",
-        "--output-dir",
-        str(output_path),
-    ]
-    monkeypatch.setattr("sys.argv", test_args)
-    main()
-    captured = caplog.text
-    print(captured)
+def test_combine_images(combined_images_dir):
+    output_path = combined_images_dir
 
     # list files in output directory
     print(f"files in output_path {list(output_path.iterdir())}")
@@ -88,3 +77,60 @@ def test_combine_images_collage(caplog, monkeypatch, tmp_path):
 
     assert len(list(output_path.iterdir())) == 1  # only one file
     assert (output_path / Path("rocks.png")).exists()
+
+
+def test_combine_images_prepack(caplog, monkeypatch, tmp_path, combined_images_dir):
+    # pack a copy of the frames, so the packed files are not written to the resources directory
+    data_dir = tmp_path / Path("frames")
+    shutil.copytree("tests/resources/combine_images", data_dir)
+    output_path = tmp_path / Path("combined_prepack")
+    test_args = [
+        "combine_images.py",
+        str(data_dir),
+        "--prefixes",
+        "rock",
+        "pebble",
+        "--output-prefix",
+        "rocks",
+        "--output-dir",
+        str(output_path),
+        "--prepack",
+    ]
+    monkeypatch.setattr("sys.argv", test_args)
+    main()
+    # a second run packs again while the existing packs are memory-mapped, it must not corrupt them
+    main()
+
+    assert (data_dir / Path("rock_frames.npy")).exists()
+    assert (data_dir / Path("pebble_frame_numbers.npy")).exists()
+    assert (output_path / Path("rocks_0000.png")).exists()
+    assert (output_path / Path("rocks_0001.png")).exists()
+
+    # the packed frames give the same combined frames as the PNGs
+    for filename in ["rocks_0000.png", "rocks_0001.png"]:
+        assert np.array_equal(cv2.imread(str(output_path / filename)), cv2.imread(str(combined_images_dir / filename)))
+
+    # the packed frames are the decoded PNGs
+    for prefix in ["rock", "pebble"]:
+        packed = np.load(data_dir / Path(f"{prefix}_frames.npy"))
+        frame_numbers = np.load(data_dir / Path(f"{prefix}_frame_numbers.npy"))
+        assert frame_numbers.tolist() == [1, 2]
+        for frame, frame_number in zip(packed, frame_numbers):
+            assert np.array_equal(frame, cv2.imread(str(data_dir / f"{prefix}_{frame_number:04d}.png")))
+
+    # a pack older than the PNGs is not used
+    images = image_tools.get_images(str(data_dir), ["rock"], 0, -1)
+    assert all(isinstance(frame, np.ndarray) for frame in images["rock"].values())
+    packed_mtime = os.path.getmtime(data_dir / Path("rock_frames.npy"))
+    os.utime(data_dir / Path("rock_0001.png"), (packed_mtime + 10, packed_mtime + 10))
+    images = image_tools.get_images(str(data_dir), ["rock"], 0, -1)
+    assert all(isinstance(frame, str) for frame in images["rock"].values())
+
+    # a pack of part of the frames is only used for that part
+    image_tools.prepack_frames(str(data_dir), "pebble", start=2, end=2)
+    images = image_tools.get_images(str(data_dir), ["pebble"], 0, -1)
+    assert sorted(images["pebble"]) == [1, 2]
+    assert all(isinstance(frame, str) for frame in images["pebble"].values())
+    images = image_tools.get_images(str(data_dir), ["pebble"], 2, 2)
+    assert list(images["pebble"]) == [2]
+    assert isinstance(images["pebble"][2], np.ndarray)
@@ -90,3 +90,49 @@ def test_generate_traj_cases():
         assert case["sun/elevation"] == 0.14
         assert "sun/azimuth" in case
         assert case["sun/azimuth"] == 0.0
+
+
+def test_generate_cases_constant_params():
+    render_distributions = {
+        "camera/pitch": {"type": "fixed", "value": -1.57},
+        "camera/type": {"type": "list", "values": ["PERSP"]},
+        "sun/azimuth": {"type": "uniform", "min": 0.0, "max": 6.28},
+    }
+    cases_list = CaseManager().generate_cases(render_distributions, 5, "PERSP")
+    assert len(cases_list) == 5
+    for case in cases_list:
+        assert case["camera/pitch"] == pytest.approx(-1.57)
+        assert case["camera/type"] == "PERSP"
+        assert 0.0 <= case["sun/azimuth"] <= 6.28
+    cases_list[0]["camera/pitch"] = 0.0
+    assert cases_list[1]["camera/pitch"] == pytest.approx(-1.57)
+
+
+def test_generate_cases_grid_params():
+    render_distributions = {
+        "camera/z": {"type": "grid", "min": 0.0, "max": 1.0, "n_values": 3},
+        "camera/type": {"type": "grid_list", "values": ["PERSP", "ORTHO"]},
+        "sun/azimuth": {"type": "normal", "mean": 0.0, "std": 1.0},
+    }
+    case_manager = CaseManager()
+    cases_list = case_manager.generate_cases(render_distributions, 4, "PERSP")
+    assert len(cases_list) == 6
+    grid_sizes, _ = case_manager.cases_grid_sizes(render_distributions, 6)
+    for i, case in enumerate(cases_list):
+        grid_indices = case_manager.cases_grid_indices(grid_sizes, i)
+        assert case["camera/z"] == pytest.approx(0.5 * grid_indices["camera/z"])
+        assert case["camera/type"] == ["PERSP", "ORTHO"][grid_indices["camera/type"]]
+        assert isinstance(case["sun/azimuth"], float)
+
+
+def test_generate_cases_seed():
+    render_distributions = {
+        "camera/z": {"type": "grid", "min": 0.0, "max": 1.0, "n_values": 3},
+        "camera/type": {"type": "list", "values": ["PERSP", "ORTHO"]},
+        "sun/azimuth": {"type": "uniform", "min": 0.0, "max": 6.28},
+        "sun/elevation": {"type": "normal", "mean": 0.5, "std": 0.1},
+    }
+    case_manager = CaseManager()
+    cases_list = case_manager.generate_cases(render_distributions, 30, "PERSP", seed=42)
+    assert cases_list == case_manager.generate_cases(render_distributions, 30, "PERSP", seed=42)
+    assert cases_list != case_manager.generate_cases(render_distributions, 30, "PERSP", seed=43)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+#  Copyright (c) 2024. Jet Propulsion Laboratory. All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+from lunasynth import dem_tools
+from lunasynth.dem_tools import DEM, load_dem
+from scipy.ndimage import zoom
+
+dem_file = Path(__file__).parent / "resources" / "mesh_100m_5mpix.tif"
+
+
+def test_dem_zoom_methods():
+    # the default zoom is scipy's cubic spline
+    with DEM(dem_file) as dem:
+        band = dem.band1.copy()
+        dem.zoom(1.5)
+        np.testing.assert_allclose(dem.band1, zoom(band, 1.5), rtol=1e-5, atol=1e-4)
+        assert (dem.height, dem.width) == dem.band1.shape
+
+    # the bilinear kernel samples the same grid as scipy's linear zoom
+    with DEM(dem_file) as dem:
+        dem.zoom(1.5, method="bilinear")
+        np.testing.assert_allclose(dem.band1, zoom(band, 1.5, order=1), rtol=1e-5, atol=1e-4)
+        assert (dem.height, dem.width) == dem.band1.shape
+
+    # downsampling through GDAL stays close to the cubic zoom of the loaded band
+    with DEM(dem_file) as dem:
+        dem.zoom(0.5, method="bilinear")
+        bilinear = dem.band1
+    with DEM(dem_file) as dem:
+        dem.band1 = band.copy()
+        dem.zoom(0.5)
+        cubic = dem.band1
+    assert bilinear.shape == cubic.shape
+    assert bilinear.min() >= band.min() - 1e-3
+    assert bilinear.max() <= band.max() + 1e-3
+    assert np.abs(bilinear - cubic).mean() < 0.05 * np.ptp(cubic)
+
+
+@pytest.mark.parametrize("method", ["cubic", "bilinear"])
+def test_dem_downsample_unloaded(method, monkeypatch):
+    # an unloaded DEM is downsampled by GDAL while reading, the full band is never read
+    read_shapes = []
+    read_band = DEM.read_band
+
+    def recording_read_band(self, *args, **kwargs):
+        band = read_band(self, *args, **kwargs)
+        read_shapes.append(band.shape)
+        return band
+
+    monkeypatch.setattr(DEM, "read_band", recording_read_band)
+    with DEM(dem_file) as dem:
+        full_shape = (dem.height, dem.width)
+        dem.zoom(0.5, method=method)
+        assert dem.band1.shape == (round(full_shape[0] * 0.5), round(full_shape[1] * 0.5))
+        assert (dem.height, dem.width) == dem.band1.shape
+    assert read_shapes == [dem.band1.shape]
+    assert not np.isnan(dem.band1).any()
+
+
+def test_load_dem_cache(monkeypatch, tmp_path):
+    dem_copy = tmp_path / dem_file.name
+    shutil.copy(dem_file, dem_copy)
+    with DEM(dem_file) as dem:
+        band = dem.band1
+
+    # the first load writes the cache, the second one memory-maps it
+    np.testing.assert_array_equal(load_dem(str(dem_copy)), band)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [dem_copy.name, f"{dem_copy.name}.npy"]
+    cached = load_dem(str(dem_copy))
+    assert isinstance(cached, np.memmap)
+    np.testing.assert_array_equal(cached, band)
+
+    # a cache that cannot be written is skipped, without leaving a partial file behind
+    (tmp_path / f"{dem_copy.name}.npy").unlink()
+
+    def failing_replace(src, dst):
+        raise PermissionError(dst)
+
+    monkeypatch.setattr(dem_tools.os, "replace", failing_replace)
+    np.testing.assert_array_equal(load_dem(str(dem_copy)), band)
+    assert [p.name for p in tmp_path.iterdir()] == [dem_copy.name]
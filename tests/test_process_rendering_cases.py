@@ -14,6 +14,8 @@
 #  limitations under the License.
 
 
+import os
+
 from lunasynth.cli.process_sampling_cases import main
 
 
@@ -78,10 +80,9 @@ def test_process_sampling_cases_simple(capsys, monkeypatch, tmp_path):
     main()
 
     # Check files in output dir
-    output_files = list(output_dir.glob("*"))
-    output_files = [f.stem for f in output_files]
-
+    output_files = os.listdir(output_dir)
     assert len(output_files) == 11
+    output_files = {os.path.splitext(f)[0] for f in output_files}
     prefixes_expected = [
         "rgb",
         "depth",
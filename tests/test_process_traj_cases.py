@@ -15,6 +15,7 @@
 
 
 import json
+import os
 from pathlib import Path
 
 from lunasynth.cli.generate_traj_definition import main as main_traj_definition
@@ -105,10 +106,9 @@ def test_protraj_cases_simple(capsys, monkeypatch, tmp_path):
     assert (output_dir / "params.json").exists()
 
     # Check files in output dir
-    output_files = list(output_dir.glob("*"))
-    output_files = [f.stem for f in output_files]
-
+    output_files = os.listdir(output_dir)
     assert len(output_files) == 11
+    output_files = {os.path.splitext(f)[0] for f in output_files}
     print(output_files)
     prefixes_expected = [
         "rgb",
@@ -14,65 +14,32 @@
 #  limitations under the License.
 
 
+import os
 from pathlib import Path
 
+import pytest
 from lunasynth.cli.assign_pass_index import main as main_assign_pass_index
 from lunasynth.cli.render_blendfile import main
 
 
-def test_render_blendfile_basic(caplog, monkeypatch, tmp_path):
+@pytest.mark.parametrize(
+    ("extra_args", "expected_files"),
+    [
+        ([], {"test_load_rocks.png"}),
+        (["--depth"], {"test_load_rocks.png", "depth.exr", "depth_norm.png"}),
+        (["--segmentation"], {"test_load_rocks.png", "segmentation_integer.png", "segmentation_color.png"}),
+    ],
+    ids=["basic", "depth", "segmentation"],
+)
+def test_render_blendfile(caplog, monkeypatch, tmp_path, extra_args, expected_files):
     # render it
-
-    output_path = tmp_path / Path("test_render_blendfile_basic")
-    test_args = [
-        "render_blendfile.py",
-        "tests/resources/test_load_rocks.blend",
-        "--output-dir",
-        str(output_path),
-    ]
-    monkeypatch.setattr("sys.argv", test_args)
-    main()
-    captured = caplog.text
-    print(captured)
-
-    # get files in output directory
-    files = list(output_path.glob("*"))
-    assert len(files) == 1
-    assert files[0].name == "test_load_rocks.png"
-
-
-def test_render_blendfile_depth(caplog, monkeypatch, tmp_path):
-    # render it
-
-    output_path = tmp_path / Path("test_render_blendfile_depth")
-    test_args = [
-        "render_blendfile.py",
-        "tests/resources/test_load_rocks.blend",
-        "--output-dir",
-        str(output_path),
-        "--depth",
-    ]
-    monkeypatch.setattr("sys.argv", test_args)
-    main()
-    captured = caplog.text
-    print(captured)
-
-    # get files in output directory
-    files = list(output_path.glob("*"))
-    assert len(files) == 3
-    assert "test_load_rocks.png" in [f.name for f in files]
-    assert "depth.exr" in [f.name for f in files]
-    assert "depth_norm.png" in [f.name for f in files]
-
-
-def test_render_blendfile_segmentation(caplog, monkeypatch, tmp_path):
-    output_path = tmp_path / Path("test_render_blendfile_segmentation")
+    output_path = tmp_path / Path("test_render_blendfile")
     test_args = [
         "render_blendfile.py",
         "tests/resources/test_load_rocks.blend",
         "--output-dir",
         str(output_path),
-        "--segmentation",
+        *extra_args,
     ]
     monkeypatch.setattr("sys.argv", test_args)
     main()
@@ -80,11 +47,9 @@ def test_render_blendfile_segmentation(caplog, monkeypatch, tmp_path):
     print(captured)
 
     # get files in output directory
-    files = list(output_path.glob("*"))
-    assert len(files) == 3
-    assert "test_load_rocks.png" in [f.name for f in files]
-    assert "segmentation_integer.png" in [f.name for f in files]
-    assert "segmentation_color.png" in [f.name for f in files]
+    files = os.listdir(output_path)
+    assert len(files) == len(expected_files)
+    assert set(files) == expected_files
 
 
 def test_assign_pass_index(caplog, monkeypatch, tmp_path):
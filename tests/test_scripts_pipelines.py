@@ -14,7 +14,10 @@
 #  limitations under the License.
 
 
-import os
+import glob
+import importlib
+import re
+import shlex
 import subprocess
 from pathlib import Path
 
@@ -23,36 +26,74 @@ import pytest
 # test all pipelines. parametrize the test with the pipeline name
 
 pipelines_path = Path(__file__).parent.parent / "scripts" / "pipelines"
+repo_path = pipelines_path.parent.parent
 
-# find all .sh in the pipelines directory
-pipeline_files = pipelines_path.glob("*.sh")
+# find all .sh in the pipelines directory, sorted so every xdist worker collects the same parameters
+pipeline_files = sorted(pipelines_path.glob("*.sh"))
 
 
-@pytest.mark.parametrize("pipeline_file", pipeline_files)
-def test_pipelines(pipeline_file):
+# a lunasynth cli script run with python, e.g. python src/lunasynth/cli/create_rock_field.py
+cli_command_pattern = re.compile(r"python3? src/(lunasynth/cli/\w+)\.py")
+# shell expansions that shlex does not perform: parameters, command substitution and home directories
+shell_expansion_pattern = re.compile(r"[$`]|(^|[\s=:])~")
+
+
+def single_cli_command(pipeline_file: Path) -> tuple[str, list[str]] | None:
+    """Returns the cli module and arguments if the pipeline only runs one lunasynth cli script, otherwise None"""
+    script = re.sub(r"\\\n", " ", pipeline_file.read_text())  # join continued lines
+    commands = [
+        line.strip()
+        for line in script.splitlines()
+        if line.strip() and not line.lstrip().startswith("#") and not line.lstrip().startswith("set ")
+    ]
+    if len(commands) != 1 or shell_expansion_pattern.search(commands[0]):
+        return None
+    args = shlex.split(commands[0], comments=True)
+    if any(glob.has_magic(arg) and glob.glob(arg, root_dir=repo_path) for arg in args):
+        # bash would expand the pattern, it is only passed as is when nothing matches
+        return None
+    match = cli_command_pattern.fullmatch(" ".join(args[:2]))
+    if match is None:
+        return None
+    return match.group(1).replace("/", "."), [args[1], *args[2:]]
+
+
+@pytest.fixture
+def reset_blender_scene():
+    """Empties the Blender session after the test, so a pipeline run in-process does not leak its scene"""
+    yield
+    try:
+        import bpy
+    except ImportError:
+        return
+    # factory startup data without reloading the preferences set up for the session
+    bpy.ops.wm.read_homefile(use_empty=True, use_factory_startup=True)
+
+
+@pytest.mark.parametrize("pipeline_file", pipeline_files, ids=[p.name for p in pipeline_files])
+def test_pipelines(pipeline_file, monkeypatch, reset_blender_scene):
     # run the pipeline
     print(f"Running pipeline {str(pipeline_file)}")
+    cli_command = single_cli_command(pipeline_file)
+    if cli_command is not None:
+        # a single cli call runs in this interpreter, saving the python and blender startup of a subprocess
+        module_name, argv = cli_command
+        monkeypatch.chdir(repo_path)
+        monkeypatch.setattr("sys.argv", argv)
+        importlib.import_module(module_name).main()
+        return
     # Ensure the script is executable
     # if not pipeline_file.is_executable():
     #     pytest.skip(f"Script {pipeline_file} is not executable.")
     try:
-        # Run the script
-        ret = subprocess.run(
+        # Run the script from the repository root, check=True raises an exception if the return code is not 0.
+        # Only stderr is kept, the Blender render logs on stdout can be large
+        subprocess.run(
             [str(pipeline_file)],  # command to run
-            check=True,  # check=True raises an exception if the return code is not 0
-            capture_output=True,  # capture_output returns bytes, convert to string
-            text=True,  # capture_output returns bytes, convert to string
-            env=os.environ,  # pass the environment variables
-            cwd=str(
-                pipeline_file.parent.parent.parent
-            ),  # set the working directory to the parent of the pipeline folde
-        )  # set the working directory to the parent of the pipeline folde
-    except subprocess.CalledProcessError as e:
-        pytest.fail(
-            f"Error running {pipeline_file}: \n" f"stdout: {e.stdout.decode()}\n" f"stderr: {e.stderr.decode()}"
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            cwd=str(repo_path),
         )
-    ret = subprocess.run(["bash", "-c", str(pipeline_file)], shell=True, check=True, capture_output=True)
-    # print the output
-    print(ret.stdout)
-    # check the output returncode
-    assert ret.returncode == 0
+    except subprocess.CalledProcessError as e:
+        pytest.fail(f"Error running {pipeline_file}: \n" f"stderr: {e.stderr.decode(errors='replace')}")
@@ -30,10 +30,9 @@ def test_generate_rock_field():
 
     # check rock field
     assert rock_field.rocks is not None
-    for rock in rock_field.rocks:
-        assert rock.x >= 0
-        assert rock.x < 10
-        assert rock.y >= 0
-        assert rock.y < 10
-        assert rock.diameter >= 0.39
-        assert rock.diameter <= 6.01
+    assert (rock_field.xv >= 0).all()
+    assert (rock_field.xv < 10).all()
+    assert (rock_field.yv >= 0).all()
+    assert (rock_field.yv < 10).all()
+    assert (rock_field.diameters >= 0.39).all()
+    assert (rock_field.diameters <= 6.01).all()